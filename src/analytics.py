@@ -0,0 +1,272 @@
+# analytics.py - Columnar sales analytics on pandas DataFrames
+import threading
+import connection_manager
+from connection_manager import get_connection, open_connection, data_signature
+from date_keys import day_key, UNDATED_DAY
+from lazy_imports import lazy_import
+
+# pandas only loads when an analytics report is first run
+pd = lazy_import('pandas')
+
+# Query and column types for each table frame. Categories are applied after
+# the chunks are joined, so every chunk shares one set of categories.
+FRAME_SOURCES = {
+    "sales": (
+        """SELECT id, phone_id, client_id, user_id, quantity, unit_price, total_price,
+                  payment_method, sale_date, sale_day
+           FROM sales""",
+        {"id": "int64", "phone_id": "int64", "client_id": "Int64", "user_id": "int64",
+         "quantity": "int64", "unit_price": "float64", "total_price": "float64",
+         "payment_method": "category", "sale_date": "string", "sale_day": "Int64"},
+    ),
+    "phones": (
+        "SELECT id, brand, model, price, cost_price, quantity FROM phones",
+        {"id": "int64", "brand": "category", "model": "string", "price": "float64",
+         "cost_price": "float64", "quantity": "Int64"},
+    ),
+    "clients": (
+        "SELECT id, name FROM clients",
+        {"id": "int64", "name": "string"},
+    ),
+    "users": (
+        "SELECT id, username FROM users",
+        {"id": "int64", "username": "category"},
+    ),
+}
+
+# Names accepted by breakdown() and the frame column each one reads
+DIMENSIONS = {
+    "day": "day",
+    "week": "week",
+    "month": "month",
+    "year": "year",
+    "brand": "brand",
+    "product": "product",
+    "payment_method": "payment_method",
+    "seller": "seller",
+    "client": "client",
+}
+
+# Measures that can be aggregated
+MEASURES = ("total_price", "quantity", "cost", "margin", "sales_count")
+
+
+def read_frame(conn, sql, dtypes, chunk_size=20000):
+    """Read a query into a typed DataFrame, fetching chunk_size rows at a time"""
+    cursor = conn.cursor()
+    cursor.execute(sql)
+    columns = [d[0] for d in cursor.description]
+    chunk_types = {name: kind for name, kind in dtypes.items() if kind != "category"}
+
+    chunks = []
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            break
+        chunks.append(pd.DataFrame.from_records(rows, columns=columns).astype(chunk_types))
+    cursor.close()
+
+    if chunks:
+        frame = pd.concat(chunks, ignore_index=True)
+    else:
+        frame = pd.DataFrame({name: pd.Series(dtype=kind) for name, kind in chunk_types.items()})
+    return frame.astype(dtypes)
+
+
+def product_names(frame):
+    """Brand and model joined into one product name per row"""
+    return (frame["brand"].astype("string") + " " + frame["model"]).astype("category")
+
+
+def percent(part, whole):
+    """part / whole * 100, NaN where whole is 0"""
+    return part / whole.where(whole > 0) * 100
+
+
+def frame_to_rows(frame):
+    """Turn a result frame into (column names, rows of plain values) for a Treeview"""
+    frame = frame.reset_index()
+    for name in frame.columns:
+        column = frame[name]
+        if pd.api.types.is_float_dtype(column):
+            frame[name] = column.round(2)
+        elif not pd.api.types.is_numeric_dtype(column):
+            frame[name] = column.astype(str)
+    columns = [str(name) for name in frame.columns]
+    return columns, list(frame.itertuples(index=False, name=None))
+
+
+class SalesAnalytics:
+    """Pivots, rolling averages, margin and sell-through over cached frames
+
+    Tables are loaded once into typed DataFrames and reused until the
+    database changes. All worker threads share one set of frames, checked
+    against one data version (data_version), and frames are built under a
+    lock so threads asking at once share a single load.
+    """
+
+    def __init__(self, chunk_size=20000):
+        self.chunk_size = chunk_size
+        # Re-entrant: the joined frame is built from the table frames
+        self._lock = threading.RLock()
+        self._frames = {}
+        self._version = None
+        self._watch_conn = None
+
+    def invalidate(self):
+        with self._lock:
+            self._frames.clear()
+
+    def data_version(self):
+        """A value that moves whenever anyone commits to the database
+
+        Read from a private connection that never writes, so its
+        data_signature only changes when another connection - any thread's,
+        or another process's - commits. Call with the lock held.
+        """
+        if self._watch_conn is None:
+            self._watch_conn = open_connection(read_only=connection_manager.READ_ONLY)
+        return data_signature(self._watch_conn)
+
+    def _check_version(self):
+        version = self.data_version()
+        if version != self._version:
+            self._frames.clear()
+            self._version = version
+
+    def _cached(self, name, build):
+        if name not in self._frames:
+            self._frames[name] = build()
+        return self._frames[name]
+
+    def _table(self, name):
+        sql, dtypes = FRAME_SOURCES[name]
+        return self._cached(
+            name, lambda: read_frame(get_connection(), sql, dtypes, self.chunk_size)
+        )
+
+    def frame(self, name):
+        """The typed DataFrame for one of FRAME_SOURCES"""
+        with self._lock:
+            self._check_version()
+            return self._table(name)
+
+    def sales(self, date_from=None, date_to=None):
+        """Sales joined to phone, client and seller, with the report dimensions
+
+        The joined frame is cached like the table frames; the date range is
+        applied as a mask on the integer day key.
+        """
+        with self._lock:
+            self._check_version()
+            frame = self._cached("sales_joined", self._join_sales)
+        if date_from is not None or date_to is not None:
+            mask = pd.Series(True, index=frame.index)
+            if date_from is not None:
+                mask &= frame["sale_day"] >= day_key(date_from)
+            if date_to is not None:
+                mask &= frame["sale_day"] <= day_key(date_to)
+            frame = frame[mask.fillna(False)]
+        return frame
+
+    def _join_sales(self):
+        phones = self._table("phones")[["id", "brand", "model", "cost_price"]]
+        clients = self._table("clients")
+        users = self._table("users")
+
+        frame = (
+            self._table("sales")
+            .merge(phones.rename(columns={"id": "phone_id"}), on="phone_id", how="left")
+            .merge(clients.rename(columns={"id": "client_id", "name": "client"}),
+                   on="client_id", how="left")
+            .merge(users.rename(columns={"id": "user_id", "username": "seller"}),
+                   on="user_id", how="left")
+        )
+
+        # Buckets come from the same day key as the date filter and the SQL
+        # rollup; parsing sale_date text would drop rows whose format differs
+        # from the first row's
+        undated = frame["sale_day"].eq(UNDATED_DAY).fillna(True)
+        dates = pd.to_datetime(frame["sale_day"].astype("string").mask(undated),
+                               format="%Y%m%d", errors="coerce")
+        frame["day"] = dates.dt.normalize()
+        frame["week"] = dates.dt.to_period("W")
+        frame["month"] = dates.dt.to_period("M")
+        frame["year"] = dates.dt.year
+        frame["product"] = product_names(frame)
+        frame["cost"] = frame["quantity"] * frame["cost_price"]
+        frame["margin"] = frame["total_price"] - frame["cost"]
+        frame["sales_count"] = 1
+        return frame
+
+    def breakdown(self, rows, columns=None, values="total_price", aggfunc="sum",
+                  date_from=None, date_to=None):
+        """Pivot a measure over any dimensions, e.g. breakdown("brand", "month")
+
+        rows and columns are dimension names (or lists of them) from
+        DIMENSIONS; values is one of MEASURES.
+        """
+        rows = [rows] if isinstance(rows, str) else list(rows)
+        columns = [] if columns is None else [columns] if isinstance(columns, str) else list(columns)
+        unknown = [name for name in rows + columns if name not in DIMENSIONS]
+        if unknown:
+            raise ValueError(f"Unknown dimensions: {', '.join(unknown)}")
+        if values not in MEASURES:
+            raise ValueError(f"Unknown measure: {values}")
+
+        frame = self.sales(date_from, date_to)
+        return frame.pivot_table(
+            index=[DIMENSIONS[name] for name in rows],
+            columns=[DIMENSIONS[name] for name in columns] or None,
+            values=values,
+            aggfunc=aggfunc,
+            fill_value=0,
+            observed=True,
+        )
+
+    def rolling_average(self, window=7, values="total_price", date_from=None, date_to=None):
+        """Daily totals with a trailing window-day average; days without sales count as 0"""
+        frame = self.sales(date_from, date_to)
+        daily = frame.dropna(subset=["day"]).groupby("day")[values].sum()
+        if not daily.empty:
+            daily = daily.asfreq("D", fill_value=0)
+        return pd.DataFrame({
+            values: daily,
+            "rolling_average": daily.rolling(window, min_periods=1).mean(),
+        }).rename_axis("day")
+
+    def margins(self, by="product", date_from=None, date_to=None):
+        """Revenue, cost, margin and margin % per group"""
+        frame = self.sales(date_from, date_to)
+        grouped = frame.groupby(DIMENSIONS[by], observed=True)
+        result = grouped.agg(units=("quantity", "sum"), revenue=("total_price", "sum"))
+        # Groups where no phone has a cost price get no cost rather than 0
+        result["cost"] = grouped["cost"].sum(min_count=1)
+        result["margin"] = result["revenue"] - result["cost"]
+        result["margin_pct"] = percent(result["margin"], result["revenue"])
+        return result.sort_values("margin", ascending=False)
+
+    def sell_through(self, by="product", date_from=None, date_to=None):
+        """Units sold against units still in stock, per brand or product"""
+        if by not in ("brand", "product"):
+            raise ValueError("Sell-through is only available by brand or product")
+
+        phones = self.frame("phones")
+        stock = phones.assign(product=product_names(phones)).groupby(by, observed=True)["quantity"].sum()
+        sold = self.sales(date_from, date_to).groupby(by, observed=True)["quantity"].sum()
+
+        result = pd.DataFrame({"units_sold": sold, "in_stock": stock}).fillna(0).astype("int64")
+        result["sell_through_pct"] = percent(result["units_sold"],
+                                             result["units_sold"] + result["in_stock"])
+        return result.rename_axis(by).sort_values("sell_through_pct", ascending=False)
+
+
+_analytics = None
+
+
+def get_analytics():
+    """Return the application-wide analytics engine"""
+    global _analytics
+    if _analytics is None:
+        _analytics = SalesAnalytics()
+    return _analytics
@@ -3,6 +3,7 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 import sqlite3
 import hashlib
+import multiprocessing
 import ttkbootstrap as ttk_boot
 from ttkbootstrap.constants import *
 
@@ -185,6 +186,10 @@ class AuthWindow:
 def main():
     """Main function to start the application"""
     try:
+        # Bring the database schema up to date (no-op when already current)
+        from database import initialize_database
+        initialize_database()
+        
         # Create the main window with ttkbootstrap
         root = ttk_boot.Window(themename="morph")
         
@@ -200,4 +205,7 @@ def main():
 
 
 if __name__ == "__main__":
+    # Label sheets use a spawned process pool; in the frozen exe each worker
+    # re-runs this file and must stop here instead of opening the app
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
@@ -0,0 +1,130 @@
+# background_search.py - Debounced search that runs queries off the Tk thread
+import queue
+import threading
+from connection_manager import get_connection
+
+
+class DebouncedSearch:
+    """Run a search function on a worker thread as the user types
+
+    Every request gets a generation number. Keystrokes inside the debounce
+    window replace each other, so typing a word costs one query. A query
+    that is still running when the user types again is interrupted, and any
+    result that arrives for an old generation is dropped. Results are handed
+    back to the Tk thread by polling with after(), never from the worker.
+    """
+
+    def __init__(self, widget, search_func, on_results, on_error=None,
+                 delay_ms=250, poll_ms=30):
+        self.widget = widget
+        self.search_func = search_func  # search_func(conn, term) -> rows
+        self.on_results = on_results
+        self.on_error = on_error
+        self.delay_ms = delay_ms
+        self.poll_ms = poll_ms
+
+        self.generation = 0
+        self._last_term = None
+        self._after_id = None
+        self._poll_id = None
+        self._outstanding = 0
+
+        self._requests = queue.Queue()
+        self._results = queue.Queue()
+        self._lock = threading.Lock()
+        self._running = None  # (generation, connection) of the active query
+
+        self._worker = threading.Thread(target=self._work, daemon=True)
+        self._worker.start()
+
+    def submit(self, term):
+        """Debounce a search, e.g. from a <KeyRelease> handler"""
+        if term == self._last_term:
+            return  # arrow keys, shift, etc. don't change the query
+        self._last_term = term
+        self._next_generation()
+        self._after_id = self.widget.after(self.delay_ms, self._dispatch,
+                                           self.generation, term)
+
+    def search_now(self, term):
+        """Search immediately, e.g. from a Search button"""
+        self._last_term = term
+        self._next_generation()
+        self._dispatch(self.generation, term)
+
+    def cancel(self):
+        """Drop any pending or running search without starting another"""
+        self._last_term = None
+        self._next_generation()
+
+    def close(self):
+        """Stop the worker thread and cancel any pending callbacks"""
+        self._next_generation()
+        if self._poll_id is not None:
+            self.widget.after_cancel(self._poll_id)
+            self._poll_id = None
+        self._requests.put((None, None))
+
+    def _next_generation(self):
+        self.generation += 1
+        if self._after_id is not None:
+            self.widget.after_cancel(self._after_id)
+            self._after_id = None
+
+        # Interrupt a query the user has already typed past
+        with self._lock:
+            if self._running and self._running[0] != self.generation:
+                self._running[1].interrupt()
+
+    def _dispatch(self, generation, term):
+        self._after_id = None
+        if generation != self.generation:
+            return
+        self._outstanding += 1
+        self._requests.put((generation, term))
+        if self._poll_id is None:
+            self._poll_id = self.widget.after(self.poll_ms, self._poll)
+
+    def _work(self):
+        while True:
+            generation, term = self._requests.get()
+            if generation is None:
+                break
+
+            # Skip requests that went stale while waiting in the queue
+            if generation != self.generation:
+                self._results.put((generation, None, None))
+                continue
+
+            try:
+                conn = get_connection()
+                with self._lock:
+                    self._running = (generation, conn)
+                rows = self.search_func(conn, term)
+                self._results.put((generation, rows, None))
+            except Exception as e:
+                self._results.put((generation, None, e))
+            finally:
+                with self._lock:
+                    self._running = None
+
+    def _poll(self):
+        self._poll_id = None
+        while True:
+            try:
+                generation, rows, error = self._results.get_nowait()
+            except queue.Empty:
+                break
+            self._outstanding -= 1
+
+            if generation != self.generation:
+                continue  # stale result, the user has typed since
+
+            if error is not None:
+                if self.on_error:
+                    self.on_error(error)
+            else:
+                self.on_results(rows)
+
+        if self._outstanding > 0:
+            self._poll_id = self.widget.after(self.poll_ms, self._poll)
@@ -0,0 +1,157 @@
+# background_tasks.py - Shared worker pool for database work in the Tk app
+import queue
+import threading
+import traceback
+import tkinter as tk
+from tkinter import messagebox
+from concurrent.futures import ThreadPoolExecutor
+import ttkbootstrap as ttk
+
+
+class TaskCancelled(Exception):
+    """Raised inside a task that noticed its token was cancelled"""
+
+
+class CancellationToken:
+    """Lets the UI cancel a submitted task
+
+    A cancelled task's callbacks are never called. Long-running tasks can
+    also check the token themselves (raise_if_cancelled) to stop early.
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def raise_if_cancelled(self):
+        if self.cancelled:
+            raise TaskCancelled()
+
+
+class BusyIndicator:
+    """An indeterminate progress bar shown while a tab has work running"""
+
+    def __init__(self, parent, **pack_options):
+        self.bar = ttk.Progressbar(parent, mode='indeterminate')
+        self.pack_options = pack_options or {'fill': tk.X, 'padx': 10}
+        self.count = 0
+
+    def start(self):
+        self.count += 1
+        if self.count == 1:
+            self.bar.pack(**self.pack_options)
+            self.bar.start(10)
+
+    def stop(self):
+        self.count = max(0, self.count - 1)
+        if self.count == 0:
+            self.bar.stop()
+            self.bar.pack_forget()
+
+
+def show_task_error(title, error):
+    """Default error handler: log the traceback and tell the user"""
+    traceback.print_exception(type(error), error, error.__traceback__)
+    messagebox.showerror(title, f"{title}: {str(error)}")
+
+
+class BackgroundExecutor:
+    """Run functions on a thread pool and deliver results on the Tk thread
+
+    Worker threads never touch widgets. Finished tasks are queued and picked
+    up by an after() poll on the Tk thread, which then calls on_success or
+    on_error. Each worker thread gets its own database connection from
+    connection_manager.get_connection().
+    """
+
+    def __init__(self, root, max_workers=4, poll_ms=30):
+        self.root = root
+        self.poll_ms = poll_ms
+        self._pool = ThreadPoolExecutor(max_workers=max_workers,
+                                        thread_name_prefix='db-worker')
+        self._done = queue.Queue()
+        self._pending = 0
+        self._poll_id = None
+
+    def submit(self, func, *args, on_success=None, on_error=None, busy=None,
+               token=None, error_title="Error"):
+        """Run func(*args) in the background and return its CancellationToken
+
+        on_success(result) / on_error(exception) run on the Tk thread; if no
+        on_error is given the error is shown in a message box titled
+        error_title. busy is an optional BusyIndicator kept running until
+        the task finishes.
+        """
+        token = token or CancellationToken()
+        if busy:
+            busy.start()
+
+        def run():
+            if token.cancelled:
+                return None
+            return func(*args)
+
+        future = self._pool.submit(run)
+        future.add_done_callback(
+            lambda f: self._done.put((f, token, on_success, on_error, busy, error_title))
+        )
+
+        self._pending += 1
+        if self._poll_id is None:
+            self._poll_id = self.root.after(self.poll_ms, self._poll)
+        return token
+
+    def shutdown(self):
+        """Stop accepting work; running tasks finish but their results are dropped"""
+        if self._poll_id is not None:
+            self.root.after_cancel(self._poll_id)
+            self._poll_id = None
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def _poll(self):
+        self._poll_id = None
+        while True:
+            try:
+                future, token, on_success, on_error, busy, error_title = self._done.get_nowait()
+            except queue.Empty:
+                break
+            self._pending -= 1
+            if busy:
+                busy.stop()
+            if token.cancelled or future.cancelled():
+                continue
+
+            error = future.exception()
+            try:
+                if error is None:
+                    if on_success:
+                        on_success(future.result())
+                elif isinstance(error, TaskCancelled):
+                    pass
+                elif on_error:
+                    on_error(error)
+                else:
+                    show_task_error(error_title, error)
+            except Exception as e:
+                # A failing callback mustn't stop other results being delivered
+                show_task_error("Error", e)
+
+        if self._pending > 0:
+            self._poll_id = self.root.after(self.poll_ms, self._poll)
+
+
+_executor = None
+
+
+def get_executor(widget):
+    """Return the application-wide executor, creating it on first use"""
+    global _executor
+    if _executor is None:
+        _executor = BackgroundExecutor(widget.winfo_toplevel())
+    return _executor
@@ -0,0 +1,197 @@
+# backup_service.py - Online database backups on a background thread
+import os
+import re
+import sqlite3
+import threading
+from datetime import datetime
+import connection_manager
+from connection_manager import open_connection
+
+BACKUP_DIR = 'data/backups'
+BACKUP_PATTERN = re.compile(r"^phone_store_backup_(\d{8}_\d{6})\.db$")
+
+# Retention policy: how many of the newest daily/weekly/monthly backups to keep
+KEEP_DAILY = 7
+KEEP_WEEKLY = 4
+KEEP_MONTHLY = 12
+
+
+class BackupError(Exception):
+    """Raised when a backup fails or doesn't pass verification"""
+
+
+def backup_file_name(when=None):
+    """File name for a backup taken at the given time"""
+    when = when or datetime.now()
+    return f"phone_store_backup_{when.strftime('%Y%m%d_%H%M%S')}.db"
+
+
+def list_backups(backup_dir=BACKUP_DIR):
+    """Return [(taken_at, path)] for all backups, newest first"""
+    backups = []
+    if not os.path.exists(backup_dir):
+        return backups
+    for name in os.listdir(backup_dir):
+        match = BACKUP_PATTERN.match(name)
+        if match:
+            taken_at = datetime.strptime(match.group(1), "%Y%m%d_%H%M%S")
+            backups.append((taken_at, os.path.join(backup_dir, name)))
+    backups.sort(reverse=True)
+    return backups
+
+
+def select_backups_to_keep(backups, keep_daily=KEEP_DAILY, keep_weekly=KEEP_WEEKLY,
+                           keep_monthly=KEEP_MONTHLY):
+    """Apply the daily/weekly/monthly retention policy
+
+    backups is [(taken_at, path)] newest first. The newest backup of each of
+    the last keep_daily days, keep_weekly ISO weeks and keep_monthly months
+    is kept. Returns the set of paths to keep.
+    """
+    keep = set()
+    periods = [
+        (lambda d: d.date(), keep_daily),
+        (lambda d: d.isocalendar()[:2], keep_weekly),
+        (lambda d: (d.year, d.month), keep_monthly),
+    ]
+    for period_of, limit in periods:
+        seen = set()
+        for taken_at, path in backups:
+            period = period_of(taken_at)
+            if period in seen:
+                continue
+            if len(seen) >= limit:
+                break
+            seen.add(period)
+            keep.add(path)
+    return keep
+
+
+def prune_backups(backup_dir=BACKUP_DIR, **policy):
+    """Delete backups that fall outside the retention policy"""
+    backups = list_backups(backup_dir)
+    keep = select_backups_to_keep(backups, **policy)
+    removed = []
+    for taken_at, path in backups:
+        if path not in keep:
+            os.remove(path)
+            removed.append(path)
+    return removed
+
+
+def verify_backup(backup_path):
+    """Run PRAGMA quick_check on a backup file and raise if it isn't clean"""
+    conn = sqlite3.connect(f"file:{backup_path}?mode=ro", uri=True)
+    try:
+        result = [row[0] for row in conn.execute("PRAGMA quick_check")]
+    finally:
+        conn.close()
+    if result != ["ok"]:
+        raise BackupError(f"Backup failed verification: {'; '.join(result[:5])}")
+
+
+class BackupService:
+    """Copy the live database in small steps so the app keeps working
+
+    The backup runs page by page with a pause between steps, letting sellers
+    keep writing sales while it runs. Progress is kept on the object for the
+    UI to poll (e.g. with after()); the copy only takes its final name
+    once it passes quick_check, and old backups are then pruned.
+    """
+
+    def __init__(self, db_path=None, backup_dir=BACKUP_DIR, pages_per_step=256,
+                 step_sleep=0.05):
+        self.db_path = db_path or connection_manager.DB_PATH
+        self.backup_dir = backup_dir
+        self.pages_per_step = pages_per_step
+        self.step_sleep = step_sleep
+
+        self._lock = threading.Lock()
+        self._thread = None
+        self.remaining = 0
+        self.total = 0
+        self.state = 'idle'  # idle, running, verifying, done, failed
+        self.backup_path = None
+        self.error = None
+
+    @property
+    def progress(self):
+        """Fraction of pages copied so far, 0.0 - 1.0"""
+        with self._lock:
+            if self.state == 'done':
+                return 1.0
+            if not self.total:
+                return 0.0
+            return (self.total - self.remaining) / self.total
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, on_done=None):
+        """Start a backup on a background thread
+
+        on_done(service) is called from the worker thread when it finishes;
+        Tk code should poll state/progress instead of touching widgets there.
+        """
+        if self.is_running():
+            raise BackupError("A backup is already running")
+        self._thread = threading.Thread(target=self._run_in_thread, args=(on_done,), daemon=True)
+        self._thread.start()
+
+    def wait(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def run(self):
+        """Run a backup on the calling thread and return the verified path"""
+        self._set(state='running', remaining=0, total=0, error=None, backup_path=None)
+        os.makedirs(self.backup_dir, exist_ok=True)
+
+        final_path = os.path.join(self.backup_dir, backup_file_name())
+        partial_path = final_path + '.partial'
+
+        source = open_connection(self.db_path, read_only=True)
+        target = sqlite3.connect(partial_path)
+        try:
+            # Pin a WAL snapshot for the whole copy. Without an open read
+            # transaction every write by another connection would restart
+            # the backup from page 1 and a busy shop could never finish one.
+            source.isolation_level = None
+            source.execute("BEGIN")
+            source.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+
+            source.backup(target, pages=self.pages_per_step,
+                          progress=self._on_progress, sleep=self.step_sleep)
+            source.execute("COMMIT")
+            target.close()
+            source.close()
+
+            self._set(state='verifying')
+            verify_backup(partial_path)
+        except Exception:
+            target.close()
+            source.close()
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+            raise
+
+        os.replace(partial_path, final_path)
+        prune_backups(self.backup_dir)
+        self._set(state='done', backup_path=final_path)
+        return final_path
+
+    def _run_in_thread(self, on_done):
+        try:
+            self.run()
+        except Exception as e:
+            self._set(state='failed', error=e)
+        if on_done:
+            on_done(self)
+
+    def _on_progress(self, status, remaining, total):
+        self._set(remaining=remaining, total=total)
+
+    def _set(self, **values):
+        with self._lock:
+            for name, value in values.items():
+                setattr(self, name, value)
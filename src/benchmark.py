@@ -0,0 +1,246 @@
+# benchmark.py - Time the app's hot paths headlessly and write JSON results
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import connection_manager
+from date_keys import day_key_to_date
+from report_queries import SALES_GROUPINGS
+
+# (name, setup) pairs; setup(conn, workdir) returns the function to time
+BENCHMARKS = []
+
+SEARCH_TERMS = ["apple", "galaxy s2", "350000000012", "pixel 8 pro"]
+
+
+def benchmark(name):
+    """Register a benchmark setup function under name"""
+    def register(setup):
+        BENCHMARKS.append((name, setup))
+        return setup
+    return register
+
+
+def last_year(conn):
+    """The year up to the latest sale, so runs on the same data time the same rows"""
+    latest = conn.execute("SELECT MAX(sale_day) FROM sales").fetchone()[0]
+    if not latest:
+        raise LookupError("no dated sales to report on")
+    end = day_key_to_date(latest)
+    return end - timedelta(days=365), end
+
+
+@benchmark("load_phones")
+def bench_load_phones(conn, workdir):
+    from paged_list import KeysetPager
+
+    def run():
+        pager = KeysetPager(conn, "id, brand, model, imei, price, quantity", "phones",
+                            ["brand", "model", "id"])
+        pager.count()
+        pager.next_page()
+    return run
+
+
+@benchmark("search_phones")
+def bench_search_phones(conn, workdir):
+    from phone_search import search_phones
+
+    def run():
+        for term in SEARCH_TERMS:
+            search_phones(conn, term)
+    return run
+
+
+def make_sales_report_benchmark(group_by):
+    def setup(conn, workdir):
+        from report_cache import get_report_cache
+        from report_queries import run_sales_report
+        date_from, date_to = last_year(conn)
+
+        def run():
+            # Calendar groupings share a cached scan; time it from cold
+            get_report_cache().clear()
+            run_sales_report(date_from, date_to, group_by)
+        return run
+    return setup
+
+
+for _group_by in SALES_GROUPINGS:
+    benchmark(f"sales_report[{_group_by}]")(make_sales_report_benchmark(_group_by))
+
+
+@benchmark("sales_report[cached]")
+def bench_sales_report_cached(conn, workdir):
+    from report_queries import query_sales_report
+    date_from, date_to = last_year(conn)
+    query_sales_report(date_from, date_to, 'Month')
+    return lambda: query_sales_report(date_from, date_to, 'Month')
+
+
+@benchmark("stock_report")
+def bench_stock_report(conn, workdir):
+    from report_queries import run_stock_report
+    brand = conn.execute("SELECT brand FROM phones LIMIT 1").fetchone()
+
+    def run():
+        run_stock_report('All')
+        run_stock_report('Low Stock (<5)')
+        if brand:
+            run_stock_report('By Brand', brand[0])
+    return run
+
+
+@benchmark("analytics[brand_by_month]")
+def bench_analytics(conn, workdir):
+    import pandas  # noqa: F401
+    from analytics import SalesAnalytics
+    date_from, date_to = last_year(conn)
+
+    def run():
+        # A fresh engine each time so the frame load is part of the timing
+        SalesAnalytics().breakdown("brand", "month", date_from=date_from, date_to=date_to)
+    return run
+
+
+@benchmark("export_csv[sales]")
+def bench_export_csv(conn, workdir):
+    from bulk_export import export_table
+    path = os.path.join(workdir, "sales.csv")
+    return lambda: export_table(conn, "sales", path)
+
+
+@benchmark("export_xlsx[stock]")
+def bench_export_xlsx(conn, workdir):
+    import openpyxl  # noqa: F401 - skip the benchmark when it isn't installed
+    from report_queries import export_stock_report_xlsx
+    path = os.path.join(workdir, "stock.xlsx")
+    return lambda: export_stock_report_xlsx(path, 'All', None, "Stock Report")
+
+
+@benchmark("export_pdf[sales_by_day]")
+def bench_export_pdf(conn, workdir):
+    import fpdf  # noqa: F401
+    from report_queries import export_sales_report_pdf
+    date_from, date_to = last_year(conn)
+    path = os.path.join(workdir, "sales.pdf")
+    return lambda: export_sales_report_pdf(path, date_from, date_to, 'Day')
+
+
+@benchmark("generate_invoice_pdf")
+def bench_invoice(conn, workdir):
+    import fpdf  # noqa: F401
+    from invoice import fetch_invoice_data, generate_invoice_pdf
+    last_sale = conn.execute("SELECT MAX(id) FROM sales").fetchone()[0]
+    if last_sale is None:
+        raise LookupError("no sales to invoice")
+    invoice_data = fetch_invoice_data([last_sale], conn)[last_sale]
+    return lambda: generate_invoice_pdf(invoice_data, workdir)
+
+
+@benchmark("generate_invoices[100]")
+def bench_invoice_batch(conn, workdir):
+    import fpdf  # noqa: F401
+    from invoice import generate_invoices
+    sale_ids = [row[0] for row in conn.execute("SELECT id FROM sales ORDER BY id DESC LIMIT 100")]
+    return lambda: generate_invoices(sale_ids, workdir, conn=conn)
+
+
+def time_call(func, repeat):
+    """Run func repeat times and summarise the wall-clock times in ms"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append((time.perf_counter() - start) * 1000)
+    return {
+        "runs": repeat,
+        "min_ms": round(min(times), 3),
+        "median_ms": round(statistics.median(times), 3),
+        "mean_ms": round(statistics.fmean(times), 3),
+        "max_ms": round(max(times), 3),
+    }
+
+
+def table_counts(conn):
+    return {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            for table in ("phones", "clients", "sales")}
+
+
+def run_benchmarks(db_path, repeat=5, only=None):
+    """Run the registered benchmarks against db_path and return the results dict
+
+    A benchmark whose optional dependency is missing, or whose setup fails,
+    is recorded as skipped with the reason, and one that raises while being
+    timed is recorded as an error; neither stops the run.
+    """
+    connection_manager.set_database_path(os.path.abspath(db_path))
+    conn = connection_manager.get_connection()
+
+    results = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "database": os.path.abspath(db_path),
+        "rows": table_counts(conn),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "repeat": repeat,
+        "benchmarks": {},
+    }
+
+    with tempfile.TemporaryDirectory() as workdir:
+        for name, setup in BENCHMARKS:
+            if only and not any(name.startswith(prefix) for prefix in only):
+                continue
+            try:
+                func = setup(conn, workdir)
+            except Exception as e:
+                results["benchmarks"][name] = {"skipped": f"{type(e).__name__}: {e}"}
+                print(f"{name:<32} skipped ({type(e).__name__}: {e})")
+                continue
+            try:
+                timing = time_call(func, repeat)
+            except Exception as e:
+                results["benchmarks"][name] = {"error": f"{type(e).__name__}: {e}"}
+                print(f"{name:<32} failed ({type(e).__name__}: {e})")
+                continue
+            results["benchmarks"][name] = timing
+            print(f"{name:<32} median {timing['median_ms']:>10.1f} ms  (min {timing['min_ms']:.1f} ms)")
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the phone store's hot paths")
+    parser.add_argument("--db", default="data/benchmark_10k.db",
+                        help="database to benchmark (see generate_data.py)")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per benchmark")
+    parser.add_argument("--only", nargs="*", help="run only benchmarks whose name starts with these")
+    parser.add_argument("--output", help="JSON results file (default: benchmarks/<db>_<timestamp>.json)")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.db):
+        parser.error(f"{args.db} not found; create it with generate_data.py first")
+
+    results = run_benchmarks(args.db, args.repeat, args.only)
+
+    output = args.output
+    if not output:
+        name = os.path.splitext(os.path.basename(args.db))[0]
+        output = os.path.join("benchmarks", f"{name}_{datetime.now():%Y%m%d_%H%M%S}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {output}")
+
+
+if __name__ == "__main__":
+    main()
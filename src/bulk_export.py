@@ -0,0 +1,115 @@
+# bulk_export.py - Streaming table export to CSV or JSON Lines
+import csv
+import gzip
+import json
+import time
+from bulk_import import get_table_columns
+
+
+class ExportResult:
+    """Summary of a table export"""
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.rows_exported = 0
+        self.elapsed = 0.0
+
+    @property
+    def rows_per_second(self):
+        if self.elapsed <= 0:
+            return 0.0
+        return self.rows_exported / self.elapsed
+
+    def __str__(self):
+        return (f"Exported {self.rows_exported} rows to {self.file_path} in "
+                f"{self.elapsed:.1f}s ({self.rows_per_second:,.0f} rows/s)")
+
+
+def build_export_query(conn, table_name, columns=None, where_sql=None, params=(),
+                       date_column=None, date_from=None, date_to=None):
+    """Build a validated SELECT for an export and return (sql, params, columns)
+
+    Table and column names are checked against the schema rather than being
+    pasted into the SQL as given. where_sql is an extra filter with ?
+    placeholders; the date range is applied to date_column (inclusive).
+    """
+    table_columns = get_table_columns(conn, table_name)
+    columns = list(columns) if columns else list(table_columns)
+    unknown = [name for name in columns if name not in table_columns]
+    if date_column and date_column not in table_columns:
+        unknown.append(date_column)
+    if unknown:
+        raise ValueError(f"Unknown columns for {table_name}: {', '.join(unknown)}")
+
+    conditions = []
+    params = list(params)
+    if where_sql:
+        conditions.append(f"({where_sql})")
+    if date_column and date_from:
+        conditions.append(f"{date_column} >= ?")
+        params.append(str(date_from))
+    if date_column and date_to:
+        # Include the whole end day when sale_date has a time part
+        conditions.append(f"{date_column} < date(?, '+1 day')")
+        params.append(str(date_to))
+
+    sql = f"SELECT {', '.join(columns)} FROM {table_name}"
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    return sql, params, columns
+
+
+def open_output(file_path, compress=None):
+    """Open a text file for writing, gzip-compressed if asked or if it ends in .gz"""
+    if compress is None:
+        compress = file_path.endswith(".gz")
+    if compress:
+        return gzip.open(file_path, "wt", newline="", encoding="utf-8")
+    return open(file_path, "w", newline="", encoding="utf-8")
+
+
+def export_table(conn, table_name, file_path, columns=None, where_sql=None,
+                 params=(), date_column=None, date_from=None, date_to=None,
+                 fmt="csv", compress=None, batch_size=5000, on_progress=None):
+    """Stream a table to CSV or JSON Lines in constant memory
+
+    Rows are read with fetchmany(batch_size) and written straight out, so
+    only one batch is held at a time. fmt is "csv" or "jsonl".
+    on_progress(rows_exported, rows_per_second) is called after each batch.
+    """
+    if fmt not in ("csv", "jsonl"):
+        raise ValueError(f"Unsupported export format: {fmt}")
+
+    sql, params, columns = build_export_query(
+        conn, table_name, columns, where_sql, params, date_column, date_from, date_to
+    )
+    result = ExportResult(file_path)
+    start = time.perf_counter()
+
+    cursor = conn.cursor()
+    cursor.execute(sql, params)
+
+    with open_output(file_path, compress) as f:
+        if fmt == "csv":
+            writer = csv.writer(f)
+            writer.writerow(columns)
+            write_rows = writer.writerows
+        else:
+            def write_rows(rows):
+                f.writelines(
+                    json.dumps(dict(zip(columns, row)), default=str) + "\n" for row in rows
+                )
+
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            write_rows(rows)
+            result.rows_exported += len(rows)
+            if on_progress:
+                result.elapsed = time.perf_counter() - start
+                on_progress(result.rows_exported, result.rows_per_second)
+
+    cursor.close()
+    result.elapsed = time.perf_counter() - start
+    return result
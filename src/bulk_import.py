@@ -0,0 +1,180 @@
+# bulk_import.py - Streaming, transactional CSV import
+import csv
+import sqlite3
+import time
+
+
+class ImportResult:
+    """Summary of a bulk import"""
+
+    def __init__(self):
+        self.rows_imported = 0
+        self.rejected = []  # (line number, row, reason)
+        self.elapsed = 0.0
+
+    @property
+    def rows_per_second(self):
+        if self.elapsed <= 0:
+            return 0.0
+        return self.rows_imported / self.elapsed
+
+    def __str__(self):
+        return (f"Imported {self.rows_imported} rows in {self.elapsed:.1f}s "
+                f"({self.rows_per_second:,.0f} rows/s), {len(self.rejected)} rejected")
+
+
+def get_table_columns(conn, table_name):
+    """Return {column: (declared type, not null, has default, default SQL)} for a table"""
+    cursor = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (table_name,)
+    )
+    if cursor.fetchone() is None:
+        raise ValueError(f"Unknown table: {table_name}")
+
+    columns = {}
+    for cid, name, decl_type, notnull, default, pk in conn.execute(f"PRAGMA table_info({table_name})"):
+        columns[name] = (decl_type.upper(), bool(notnull), default is not None or bool(pk), default)
+    return columns
+
+
+def _to_int(value):
+    try:
+        return int(value)
+    except ValueError:
+        number = float(value)
+        if not number.is_integer():
+            raise ValueError(f"not a whole number: {value!r}")
+        return int(number)
+
+
+def converter_for(decl_type):
+    """Pick a Python converter using SQLite's type affinity rules"""
+    if "INT" in decl_type:
+        return _to_int
+    if any(t in decl_type for t in ("REAL", "FLOA", "DOUB", "NUMERIC", "DECIMAL")):
+        return float
+    return str
+
+
+def build_insert_sql(table_name, columns, upsert_key=None, defaults=None):
+    """INSERT statement for the CSV columns, optionally upserting on a unique key
+
+    defaults maps columns to their DEFAULT SQL; a NULL bound to one of them
+    is replaced by that default, as if the column had been left out.
+    """
+    defaults = defaults or {}
+    placeholders = ", ".join(
+        f"COALESCE(?, {defaults[col]})" if defaults.get(col) is not None else "?"
+        for col in columns
+    )
+    sql = f"INSERT INTO {table_name} ({', '.join(columns)}) VALUES ({placeholders})"
+    if upsert_key:
+        updates = ", ".join(f"{col}=excluded.{col}" for col in columns if col != upsert_key)
+        if updates:
+            sql += f" ON CONFLICT({upsert_key}) DO UPDATE SET {updates}"
+        else:
+            sql += f" ON CONFLICT({upsert_key}) DO NOTHING"
+    return sql
+
+
+def import_csv(conn, table_name, file_path, chunk_size=1000, upsert_key=None,
+               on_progress=None):
+    """Stream a CSV file into a table
+
+    The file is read and converted chunk_size rows at a time, so memory use
+    doesn't depend on the file size. Values are converted to the column types
+    from PRAGMA table_info and empty cells take the column's DEFAULT (NULL if
+    it has none). Every chunk is written with executemany under its own
+    savepoint inside one transaction; if a chunk hits a constraint error it
+    is retried row by row so only the bad rows are rejected. upsert_key turns
+    duplicates on that unique column into updates (ignored if the CSV doesn't
+    have the column).
+    on_progress(rows_imported, rows_per_second) is called after each chunk.
+    """
+    result = ImportResult()
+    table_columns = get_table_columns(conn, table_name)
+    start = time.perf_counter()
+
+    with open(file_path, "r", newline="", encoding="utf-8-sig") as f:
+        reader = csv.reader(f)
+        header = [name.strip() for name in next(reader)]
+
+        unknown = [name for name in header if name not in table_columns]
+        if unknown:
+            raise ValueError(f"Unknown columns for {table_name}: {', '.join(unknown)}")
+        if upsert_key not in header:
+            upsert_key = None  # nothing to match on, plain insert
+
+        converters = [converter_for(table_columns[name][0]) for name in header]
+        required = [table_columns[name][1] and not table_columns[name][2] for name in header]
+        defaults = {name: table_columns[name][3] for name in header}
+        sql = build_insert_sql(table_name, header, upsert_key, defaults)
+
+        if not conn.in_transaction:
+            conn.execute("BEGIN")
+        try:
+            chunk = []
+            for row in reader:
+                line_no = reader.line_num
+                if not row:
+                    continue
+                try:
+                    chunk.append((line_no, _convert_row(header, row, converters, required)))
+                except ValueError as e:
+                    result.rejected.append((line_no, row, str(e)))
+                    continue
+
+                if len(chunk) >= chunk_size:
+                    _write_chunk(conn, sql, chunk, result)
+                    chunk = []
+                    if on_progress:
+                        result.elapsed = time.perf_counter() - start
+                        on_progress(result.rows_imported, result.rows_per_second)
+
+            if chunk:
+                _write_chunk(conn, sql, chunk, result)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+    result.elapsed = time.perf_counter() - start
+    if on_progress:
+        on_progress(result.rows_imported, result.rows_per_second)
+    return result
+
+
+def _convert_row(header, row, converters, required):
+    if len(row) != len(header):
+        raise ValueError(f"expected {len(header)} fields, got {len(row)}")
+
+    values = []
+    for name, raw, convert, is_required in zip(header, row, converters, required):
+        raw = raw.strip()
+        if raw == "":
+            if is_required:
+                raise ValueError(f"{name} is required")
+            values.append(None)
+            continue
+        try:
+            values.append(convert(raw))
+        except ValueError:
+            raise ValueError(f"invalid value for {name}: {raw!r}")
+    return values
+
+
+def _write_chunk(conn, sql, chunk, result):
+    conn.execute("SAVEPOINT import_chunk")
+    try:
+        conn.executemany(sql, [values for line_no, values in chunk])
+        result.rows_imported += len(chunk)
+    except sqlite3.IntegrityError:
+        # Retry one row at a time to find the rows that break constraints
+        conn.execute("ROLLBACK TO import_chunk")
+        for line_no, values in chunk:
+            try:
+                conn.execute(sql, values)
+                result.rows_imported += 1
+            except sqlite3.IntegrityError as e:
+                result.rejected.append((line_no, values, str(e)))
+    conn.execute("RELEASE import_chunk")
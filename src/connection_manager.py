@@ -0,0 +1,116 @@
+# connection_manager.py - Shared, long-lived SQLite connections
+import sqlite3
+import threading
+import atexit
+
+DB_PATH = 'data/phone_store.db'
+
+# When True, get_connection hands out read-only connections (report workers)
+READ_ONLY = False
+
+# Pragmas applied to every connection we hand out
+PRAGMAS = [
+    ("journal_mode", "WAL"),
+    ("synchronous", "NORMAL"),
+    ("cache_size", -8000),        # ~8 MB page cache
+    ("mmap_size", 134217728),     # 128 MB memory map
+    ("foreign_keys", "ON"),
+    ("temp_store", "MEMORY"),
+    ("busy_timeout", 5000),
+]
+
+# Number of prepared statements kept per connection
+STATEMENT_CACHE_SIZE = 256
+
+# Connections keyed by (thread id, database file)
+_connections = {}
+_lock = threading.Lock()
+
+
+def apply_pragmas(conn, read_only=False):
+    """ Apply the shared pragma set to a connection """
+    cursor = conn.cursor()
+    for name, value in PRAGMAS:
+        # journal_mode is a property of the file and can't be changed read-only
+        if read_only and name == "journal_mode":
+            continue
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
+
+
+def set_database_path(db_file, read_only=False):
+    """ Point every default connection at another database file
+
+    Used by command-line tools (benchmarks, headless reports) that work on a
+    copy of the database; call it before any connection is opened. With
+    read_only, connections from get_connection can't write to the file.
+    """
+    global DB_PATH, READ_ONLY
+    DB_PATH = db_file
+    READ_ONLY = read_only
+
+
+def open_connection(db_file=None, read_only=False):
+    """ Open a new, unshared connection with the standard pragmas """
+    db_file = db_file or DB_PATH
+    if read_only:
+        conn = sqlite3.connect(f"file:{db_file}?mode=ro", uri=True,
+                               cached_statements=STATEMENT_CACHE_SIZE,
+                               check_same_thread=False)
+    else:
+        conn = sqlite3.connect(db_file, cached_statements=STATEMENT_CACHE_SIZE,
+                               check_same_thread=False)
+    apply_pragmas(conn, read_only)
+    return conn
+
+
+def get_connection(db_file=None):
+    """ Return the long-lived connection for the calling thread
+
+    Each thread gets exactly one connection per database file. It is opened
+    on first use and reused afterwards, so callers must not close it.
+    """
+    db_file = db_file or DB_PATH
+    key = (threading.get_ident(), db_file)
+    with _lock:
+        conn = _connections.get(key)
+    if conn is None:
+        conn = open_connection(db_file, read_only=READ_ONLY)
+        with _lock:
+            _connections[key] = conn
+    return conn
+
+
+def data_signature(conn):
+    """ Value that changes whenever the database is written to
+
+    PRAGMA data_version moves when another connection commits and
+    total_changes when this one writes, so between them no write is missed.
+    Only comparable between calls on the same connection.
+    """
+    data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+    return data_version, conn.total_changes
+
+
+def close_connection(db_file=None):
+    """ Close the calling thread's connection, if it has one """
+    db_file = db_file or DB_PATH
+    with _lock:
+        conn = _connections.pop((threading.get_ident(), db_file), None)
+    if conn is not None:
+        conn.close()
+
+
+def close_all_connections():
+    """ Close every connection handed out by this module """
+    with _lock:
+        connections = list(_connections.values())
+        _connections.clear()
+    for conn in connections:
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+
+atexit.register(close_all_connections)
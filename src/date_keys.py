@@ -0,0 +1,28 @@
+# date_keys.py - Integer day keys (YYYYMMDD) used to filter and group sales
+from datetime import date, datetime
+
+# SQL expression turning a TIMESTAMP/date text column into its day key
+DAY_KEY_SQL = "CAST(strftime('%Y%m%d', {}) AS INTEGER)"
+
+# Day key stored on a sale whose date doesn't parse: never NULL, so the
+# sales list can page on it, and outside every date range
+UNDATED_DAY = 0
+SALE_DAY_SQL = f"COALESCE({DAY_KEY_SQL}, {UNDATED_DAY})"
+
+# SQL expressions turning a day key back into display text
+DAY_KEY_DATE_SQL = "printf('%04d-%02d-%02d', {0} / 10000, {0} / 100 % 100, {0} % 100)"
+DAY_KEY_MONTH_SQL = "printf('%04d-%02d', {0} / 10000, {0} / 100 % 100)"
+
+
+def day_key(value):
+    """Day key for a date, datetime or ISO date string, e.g. 2024-03-15 -> 20240315"""
+    if isinstance(value, str):
+        value = date.fromisoformat(value[:10])
+    elif isinstance(value, datetime):
+        value = value.date()
+    return value.year * 10000 + value.month * 100 + value.day
+
+
+def day_key_to_date(key):
+    """The date a day key stands for"""
+    return date(key // 10000, key // 100 % 100, key % 100)
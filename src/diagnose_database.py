@@ -1,6 +1,74 @@
 # diagnose_database.py - Run this to find your database
 import os
 import sqlite3
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+# Representative report/list queries whose plans should use an index
+REPORT_QUERIES = {
+    "sales report (day/week/month/year)": """
+        SELECT day, SUM(sales_count), SUM(total_quantity), SUM(total_sales)
+        FROM sales_daily
+        WHERE day BETWEEN 20240101 AND 20241231
+        GROUP BY day ORDER BY day
+    """,
+    "sales report (by product)": """
+        SELECT p.brand || ' ' || p.model, SUM(r.sales_count), SUM(r.total_quantity), SUM(r.total_sales)
+        FROM sales_daily r LEFT JOIN phones p ON r.phone_id = p.id
+        WHERE r.day BETWEEN 20240101 AND 20241231
+        GROUP BY r.phone_id
+    """,
+    "sales report total": """
+        SELECT SUM(total_sales) FROM sales_daily
+        WHERE day BETWEEN 20240101 AND 20241231
+    """,
+    "sales list (date filter)": """
+        SELECT * FROM sales WHERE sale_day BETWEEN 20240101 AND 20241231
+    """,
+    "sales list (page)": """
+        SELECT * FROM sales WHERE sale_day BETWEEN 20240101 AND 20241231
+        ORDER BY sale_day DESC, id DESC LIMIT 200
+    """,
+    "sales by phone": "SELECT * FROM sales WHERE phone_id = 1",
+    "sales by client": "SELECT * FROM sales WHERE client_id = 1",
+    "sales by seller": "SELECT * FROM sales WHERE user_id = 1",
+    "stock report (low stock)": """
+        SELECT p.id, p.brand, p.model, p.imei, p.price, p.quantity FROM phones p
+        WHERE p.quantity < 5 ORDER BY p.brand, p.model
+    """,
+    "phone list": """
+        SELECT id, brand, model, imei, price, quantity FROM phones ORDER BY brand, model
+    """,
+}
+
+# The same reports as first written, straight off sales by date text; used
+# for the "before" plans where the query above needs a later migration
+BASE_QUERIES = {
+    "sales report (day/week/month/year)": """
+        SELECT strftime('%Y-%m-%d', s.sale_date), COUNT(*), SUM(s.quantity), SUM(s.total_price)
+        FROM sales s LEFT JOIN phones p ON s.phone_id = p.id
+        WHERE s.sale_date BETWEEN '2024-01-01' AND '2024-12-31'
+        GROUP BY strftime('%Y-%m-%d', s.sale_date)
+    """,
+    "sales report (by product)": """
+        SELECT p.brand || ' ' || p.model, COUNT(*), SUM(s.quantity), SUM(s.total_price)
+        FROM sales s LEFT JOIN phones p ON s.phone_id = p.id
+        WHERE s.sale_date BETWEEN '2024-01-01' AND '2024-12-31'
+        GROUP BY p.id
+    """,
+    "sales report total": """
+        SELECT SUM(total_price) FROM sales
+        WHERE sale_date BETWEEN '2024-01-01' AND '2024-12-31'
+    """,
+    "sales list (date filter)": """
+        SELECT * FROM sales WHERE sale_date BETWEEN '2024-01-01' AND '2024-12-31'
+    """,
+    "sales list (page)": """
+        SELECT * FROM sales WHERE sale_date BETWEEN '2024-01-01' AND '2024-12-31'
+        ORDER BY sale_date DESC
+    """,
+}
 
 def find_database_files():
     """Find all .db files in the project"""
@@ -87,6 +155,116 @@ def test_database(db_path):
         print(f"❌ Error accessing database: {e}")
         return False
 
+def explain(conn, query):
+    """Return the EXPLAIN QUERY PLAN details for a query"""
+    rows = conn.execute(f"EXPLAIN QUERY PLAN {query}").fetchall()
+    return [row[3] for row in rows]
+
+def is_full_scan(plan):
+    """True if a plan reads every row, or sorts every matching row to order them"""
+    return any(
+        (step.startswith("SCAN") and "INDEX" not in step)
+        or "TEMP B-TREE FOR ORDER BY" in step
+        for step in plan
+    )
+
+def check_query_plans():
+    """Compare report query plans on the base schema and the migrated schema"""
+    from migrations import run_migrations, LATEST_VERSION
+
+    print("=== Report Query Plans ===")
+    conn = sqlite3.connect(":memory:")
+    run_migrations(conn, target_version=1)
+    before = {}
+    for name, query in REPORT_QUERIES.items():
+        try:
+            before[name] = explain(conn, BASE_QUERIES.get(name, query))
+        except sqlite3.OperationalError:
+            # Uses a table or column added by a later migration
+            before[name] = ["(not in base schema)"]
+    run_migrations(conn, target_version=LATEST_VERSION)
+    after = {name: explain(conn, query) for name, query in REPORT_QUERIES.items()}
+    conn.close()
+
+    all_indexed = True
+    for name in REPORT_QUERIES:
+        full_scan = is_full_scan(after[name])
+        print(f"\n{'❌' if full_scan else '✓'} {name}")
+        print("  before: " + " | ".join(before[name]))
+        print("  after:  " + " | ".join(after[name]))
+        if full_scan:
+            all_indexed = False
+
+    return all_indexed
+
+def rollup_mismatches(conn):
+    """Days where sales_daily disagrees with the sales it was built from"""
+    from date_keys import DAY_KEY_SQL
+
+    day = DAY_KEY_SQL.format("sale_date")
+    return conn.execute(f"""
+        SELECT day, SUM(expected), SUM(actual) FROM (
+            SELECT {day} AS day, total_price AS expected, 0 AS actual
+            FROM sales WHERE {day} IS NOT NULL
+            UNION ALL
+            SELECT day, 0, total_sales FROM sales_daily
+        )
+        GROUP BY day
+        HAVING ROUND(SUM(expected), 2) != ROUND(SUM(actual), 2)
+    """).fetchall()
+
+def check_malformed_dates():
+    """Migrate and write sales whose sale_date isn't an ISO date
+
+    sale_date is whatever was typed, so undated sales must be left out of
+    the rollup without failing a migration or the INSERT recording them.
+    """
+    from migrations import run_migrations, LATEST_VERSION
+
+    print("=== Malformed Sale Dates ===")
+    insert_sale = """
+        INSERT INTO sales (phone_id, user_id, quantity, unit_price, total_price,
+                           payment_method, sale_date)
+        VALUES (1, 1, 1, ?, ?, 'cash', ?)
+    """
+    dates = ["2024-03-15 10:00:00", "15/03/2024", None, "", "yesterday", "2024-03-16"]
+    conn = sqlite3.connect(":memory:")
+    try:
+        # Rows already there when the rollup migrations backfill
+        run_migrations(conn, target_version=3)
+        for price, sale_date in enumerate(dates, start=1):
+            conn.execute(insert_sale, (price, price, sale_date))
+        conn.commit()
+        version = run_migrations(conn)
+        print(f"{'✓' if version == LATEST_VERSION else '❌'} migrated to version {version}")
+        ok = version == LATEST_VERSION
+
+        # Rows written through the triggers afterwards
+        for price, sale_date in enumerate(dates, start=10):
+            conn.execute(insert_sale, (price, price, sale_date))
+        conn.execute("UPDATE sales SET sale_date = '31/12/2024' WHERE sale_date = '2024-03-16'")
+        conn.execute("UPDATE sales SET sale_date = '2024-04-01' WHERE sale_date = 'yesterday'")
+        conn.execute("DELETE FROM sales WHERE sale_date IS NULL OR sale_date = '2024-03-15 10:00:00'")
+        conn.commit()
+        print("✓ undated sales can be inserted, updated and deleted")
+        unkeyed = conn.execute("SELECT COUNT(*) FROM sales WHERE sale_day IS NULL").fetchone()[0]
+        if unkeyed:
+            print(f"❌ {unkeyed} sales have no day key, so the sales list can't page past them")
+            ok = False
+        mismatches = rollup_mismatches(conn)
+    except sqlite3.Error as e:
+        print(f"❌ {type(e).__name__}: {e}")
+        return False
+    finally:
+        conn.close()
+
+    if mismatches:
+        print("❌ sales_daily disagrees with sales on: "
+              + ", ".join(str(row[0]) for row in mismatches))
+        return False
+    print("✓ sales_daily matches the dated sales")
+    return ok
+
 def main():
     print("Phone Shop App - Database Diagnostic Tool")
     print("=" * 50)
@@ -121,4 +299,8 @@ def main():
         print(f"\n❌ No working databases found with user authentication tables")
 
 if __name__ == "__main__":
+    if "--plans" in sys.argv:
+        sys.exit(0 if check_query_plans() else 1)
+    if "--dates" in sys.argv:
+        sys.exit(0 if check_malformed_dates() else 1)
     main()
\ No newline at end of file
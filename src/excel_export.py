@@ -0,0 +1,123 @@
+# excel_export.py - Streaming .xlsx export through openpyxl's write-only mode
+import time
+from itertools import chain, islice
+from bulk_export import ExportResult
+from lazy_imports import lazy_import
+
+openpyxl = lazy_import('openpyxl')
+WriteOnlyCell = lazy_import('openpyxl.cell', 'WriteOnlyCell')
+Font = lazy_import('openpyxl.styles', 'Font')
+get_column_letter = lazy_import('openpyxl.utils', 'get_column_letter')
+
+MONEY_FORMAT = '#,##0.00'
+MAX_COLUMN_WIDTH = 60
+
+
+def iter_cursor(cursor, batch_size=5000):
+    """Yield the rows of an executed cursor, fetching batch_size at a time"""
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        yield from rows
+
+
+class ColumnWidths:
+    """Widest value seen so far in each column, updated as rows go by"""
+
+    def __init__(self, columns):
+        self.lengths = [len(str(name)) for name in columns]
+
+    def update(self, row):
+        lengths = self.lengths
+        for i, value in enumerate(row):
+            if value is not None and i < len(lengths):
+                length = len(str(value))
+                if length > lengths[i]:
+                    lengths[i] = length
+
+    def widths(self):
+        return [min((length + 2) * 1.2, MAX_COLUMN_WIDTH) for length in self.lengths]
+
+
+def write_xlsx(file_path, columns, rows, title=None, sheet_title="Report", footer=None,
+               money_columns=(), width_sample=1000, on_progress=None, progress_every=5000):
+    """Write rows to a single-sheet workbook without holding them in memory
+
+    rows can be any iterable (e.g. iter_cursor(cursor)); values keep their
+    Python types so numbers stay numbers in Excel. A write-only sheet needs
+    its column widths before the first row, so widths are tracked over the
+    first width_sample rows, which are the only ones held at once.
+    money_columns are column indexes shown with a thousands separator and
+    two decimals. footer is an optional last row, written in bold.
+    on_progress(rows_exported, rows_per_second) is called every
+    progress_every rows.
+    """
+    result = ExportResult(file_path)
+    start = time.perf_counter()
+
+    rows = iter(rows)
+    sample = list(islice(rows, width_sample))
+    widths = ColumnWidths(columns)
+    for row in sample:
+        widths.update(row)
+
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet(sheet_title)
+    for i, width in enumerate(widths.widths(), 1):
+        ws.column_dimensions[get_column_letter(i)].width = width
+
+    def bold_row(values, size=None):
+        cells = []
+        for value in values:
+            cell = WriteOnlyCell(ws, value=value)
+            cell.font = Font(bold=True, size=size) if size else Font(bold=True)
+            cells.append(cell)
+        return cells
+
+    if title:
+        ws.append(bold_row([title], size=14))
+    ws.append(bold_row(columns))
+
+    # Rows are serialised as soon as they are appended, so one styled cell per
+    # money column is reused for every row instead of styling a new cell each time
+    money_cells = {}
+    for i in money_columns:
+        money_cells[i] = WriteOnlyCell(ws)
+        money_cells[i].number_format = MONEY_FORMAT
+
+    for row in chain(sample, rows):
+        if money_cells:
+            row = list(row)
+            for i, cell in money_cells.items():
+                if isinstance(row[i], (int, float)):
+                    cell.value = row[i]
+                    row[i] = cell
+        ws.append(row)
+        result.rows_exported += 1
+        if on_progress and result.rows_exported % progress_every == 0:
+            result.elapsed = time.perf_counter() - start
+            on_progress(result.rows_exported, result.rows_per_second)
+
+    if footer:
+        ws.append(bold_row(footer))
+
+    wb.save(file_path)
+    result.elapsed = time.perf_counter() - start
+    return result
+
+
+def export_query_xlsx(conn, sql, params, file_path, columns=None, batch_size=5000, **options):
+    """Run a query and stream its rows into an .xlsx file
+
+    columns defaults to the query's column names; other options are passed
+    to write_xlsx.
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.execute(sql, params)
+        if columns is None:
+            columns = [d[0] for d in cursor.description]
+        return write_xlsx(file_path, columns, iter_cursor(cursor, batch_size), **options)
+    finally:
+        cursor.close()
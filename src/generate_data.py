@@ -0,0 +1,201 @@
+# generate_data.py - Fill a database with realistic synthetic data for benchmarks
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from connection_manager import open_connection
+from migrations import run_migrations
+
+# Row counts for each named size; the name is the number of sales
+SIZES = {
+    "10k": {"phones": 1_000, "clients": 2_000, "sellers": 5, "sales": 10_000},
+    "100k": {"phones": 10_000, "clients": 20_000, "sellers": 20, "sales": 100_000},
+    "1m": {"phones": 50_000, "clients": 200_000, "sellers": 50, "sales": 1_000_000},
+}
+
+BRAND_MODELS = {
+    "Apple": ["iPhone 12", "iPhone 13", "iPhone 13 Pro", "iPhone 14", "iPhone 14 Pro Max", "iPhone 15", "iPhone SE"],
+    "Samsung": ["Galaxy S21", "Galaxy S22", "Galaxy S23 Ultra", "Galaxy A14", "Galaxy A54", "Galaxy Z Flip5"],
+    "Xiaomi": ["Redmi Note 12", "Redmi 12C", "Xiaomi 13T", "Poco X5 Pro"],
+    "Oppo": ["Reno 10", "A78", "Find X6"],
+    "Huawei": ["P60 Pro", "Nova 11", "Mate 50"],
+    "Google": ["Pixel 7", "Pixel 7a", "Pixel 8 Pro"],
+    "OnePlus": ["Nord 3", "OnePlus 11"],
+    "Motorola": ["Moto G54", "Edge 40"],
+}
+COLORS = ["Black", "White", "Blue", "Silver", "Gold", "Green", "Purple", "Red"]
+STORAGE = ["64GB", "128GB", "256GB", "512GB"]
+RAM = ["4GB", "6GB", "8GB", "12GB"]
+CONDITIONS = ["new", "new", "new", "used", "refurbished"]
+PAYMENT_METHODS = ["cash", "cash", "credit_card", "credit_card", "bank_transfer", "other"]
+
+FIRST_NAMES = ["Ahmed", "Fatima", "Youssef", "Khadija", "Omar", "Salma", "Karim", "Nadia", "Mehdi",
+               "Sara", "Hamza", "Imane", "Adam", "Lina", "Ayoub", "Zineb", "John", "Maria", "David", "Emma"]
+LAST_NAMES = ["Alaoui", "Benali", "El Idrissi", "Tazi", "Berrada", "Chraibi", "Fassi", "Naciri",
+              "Smith", "Garcia", "Martin", "Lopez", "Haddad", "Amrani", "Bennani"]
+# Sales history ends here, not today, so a seed always makes the same data
+# and benchmark results stay comparable between releases
+DEFAULT_END_DATE = datetime(2025, 1, 1)
+
+CITIES = ["Casablanca", "Rabat", "Marrakech", "Fes", "Tangier", "Agadir", "Meknes", "Oujda"]
+
+
+def luhn_check_digit(digits):
+    """Check digit that makes digits + check a valid Luhn number (as IMEIs are)"""
+    total = 0
+    for i, ch in enumerate(reversed(digits)):
+        n = int(ch)
+        if i % 2 == 0:
+            n *= 2
+            if n > 9:
+                n -= 9
+        total += n
+    return str((10 - total % 10) % 10)
+
+
+def make_imei(serial):
+    """A unique, Luhn-valid 15 digit IMEI for the given serial number"""
+    body = f"35{serial:012d}"
+    return body + luhn_check_digit(body)
+
+
+def generate_phones(rng, count):
+    for i in range(count):
+        brand = rng.choice(list(BRAND_MODELS))
+        model = rng.choice(BRAND_MODELS[brand])
+        price = round(rng.uniform(120, 1600), 2)
+        yield (
+            brand, model, make_imei(i + 1), rng.choice(COLORS), rng.choice(STORAGE),
+            rng.choice(RAM), rng.choice(CONDITIONS), price, round(price * rng.uniform(0.65, 0.9), 2),
+            rng.choice([0, 1, 2, 3, 4, 5, 8, 10, 15, 20]), f"{brand} {model} in stock",
+        )
+
+
+def generate_clients(rng, count):
+    for i in range(count):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        yield (
+            f"{first} {last}",
+            f"+2126{rng.randint(10_000_000, 99_999_999)}",
+            f"{first}.{last}{i}@example.com".lower().replace(" ", ""),
+            f"{rng.randint(1, 300)} Rue {rng.choice(LAST_NAMES)}, {rng.choice(CITIES)}",
+        )
+
+
+def generate_sales(rng, count, phone_prices, client_count, seller_ids, start, end):
+    """Sales spread over [start, end), in date order like a real shop's history"""
+    span = (end - start).total_seconds()
+    offsets = sorted(rng.random() * span for _ in range(count))
+    for offset in offsets:
+        phone_id = rng.randrange(len(phone_prices)) + 1
+        quantity = 1 if rng.random() < 0.9 else 2
+        unit_price = phone_prices[phone_id - 1]
+        client_id = rng.randint(1, client_count) if rng.random() < 0.8 else None
+        yield (
+            phone_id, client_id, rng.choice(seller_ids), quantity, unit_price,
+            round(unit_price * quantity, 2), rng.choice(PAYMENT_METHODS),
+            (start + timedelta(seconds=offset)).strftime("%Y-%m-%d %H:%M:%S"),
+        )
+
+
+def generate_database(db_path, size="10k", years=3, seed=42, overwrite=False, batch_size=10_000,
+                      end=DEFAULT_END_DATE):
+    """Create db_path with the real schema and fill it with synthetic data
+
+    Sales cover the given years up to end. Returns a dict of row counts.
+    Rows go through the normal triggers, so the rollup and search tables
+    are populated exactly as the app would.
+    """
+    if size not in SIZES:
+        raise ValueError(f"Unknown size {size!r}; choose from {', '.join(SIZES)}")
+    if os.path.exists(db_path):
+        if not overwrite:
+            raise FileExistsError(f"{db_path} already exists (use --overwrite to replace it)")
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(db_path + suffix):
+                os.remove(db_path + suffix)
+
+    counts = SIZES[size]
+    rng = random.Random(seed)
+    conn = open_connection(db_path)
+    run_migrations(conn)
+
+    def insert_many(sql, rows):
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                conn.executemany(sql, batch)
+                batch.clear()
+        if batch:
+            conn.executemany(sql, batch)
+
+    try:
+        conn.execute("BEGIN")
+        insert_many(
+            "INSERT INTO users (username, password, role, full_name) VALUES (?, ?, 'seller', ?)",
+            ((f"seller{i}", "seller123", f"Seller {i}") for i in range(1, counts["sellers"] + 1)),
+        )
+        seller_ids = [row[0] for row in conn.execute("SELECT id FROM users")]
+
+        phones = list(generate_phones(rng, counts["phones"]))
+        insert_many(
+            """INSERT INTO phones (brand, model, imei, color, storage, ram, condition,
+                                   price, cost_price, quantity, description)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            phones,
+        )
+        insert_many(
+            "INSERT INTO clients (name, phone, email, address) VALUES (?, ?, ?, ?)",
+            generate_clients(rng, counts["clients"]),
+        )
+
+        start = end - timedelta(days=365 * years)
+        insert_many(
+            """INSERT INTO sales (phone_id, client_id, user_id, quantity, unit_price,
+                                  total_price, payment_method, sale_date)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+            generate_sales(rng, counts["sales"], [p[7] for p in phones], counts["clients"],
+                           seller_ids, start, end),
+        )
+        conn.commit()
+        conn.execute("ANALYZE")
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+    return {"users": len(seller_ids), "phones": counts["phones"],
+            "clients": counts["clients"], "sales": counts["sales"]}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic phone store database")
+    parser.add_argument("--size", choices=list(SIZES), default="10k", help="number of sales rows")
+    parser.add_argument("--db", help="output database (default: data/benchmark_<size>.db)")
+    parser.add_argument("--years", type=int, default=3, help="years of sales history")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--end", type=datetime.fromisoformat, default=DEFAULT_END_DATE,
+                        help=f"end of the sales history (default {DEFAULT_END_DATE:%Y-%m-%d})")
+    parser.add_argument("--overwrite", action="store_true", help="replace an existing file")
+    args = parser.parse_args(argv)
+
+    db_path = args.db or os.path.join("data", f"benchmark_{args.size}.db")
+    os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+
+    started = time.perf_counter()
+    counts = generate_database(db_path, args.size, args.years, args.seed, args.overwrite,
+                               end=args.end)
+    elapsed = time.perf_counter() - started
+    print(f"Generated {db_path} in {elapsed:.1f}s: "
+          + ", ".join(f"{count:,} {name}" for name, count in counts.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,36 +1,262 @@
 # invoice.py
-from fpdf import FPDF
 from datetime import datetime
 import os
-from database import create_connection
+import time
+import threading
+from concurrent.futures import as_completed
+from connection_manager import get_connection, data_signature
+from lazy_imports import lazy_import
+from pdf_table import TextMeasurer, money, pdf_text
+from process_pool import spawn_pool
 import sqlite3
 
-def generate_invoice_pdf(invoice_data):
+FPDF = lazy_import('fpdf', 'FPDF')
+# Only needed to merge a batch into one printable file
+PdfWriter = lazy_import('pypdf', 'PdfWriter')
+
+INVOICES_DIR = 'data/invoices'
+DEFAULT_LOGO_PATH = 'data/store_logo.png'  # used when store_info has no logo_path
+
+# Everything an invoice shows, for many sales at once
+INVOICE_QUERY = """
+    SELECT s.id, s.sale_date, u.full_name, c.name, c.phone, c.address,
+           p.brand, p.model, p.imei, s.quantity, s.unit_price, s.total_price,
+           s.payment_method
+    FROM sales s
+    JOIN phones p ON p.id = s.phone_id
+    JOIN users u ON u.id = s.user_id
+    LEFT JOIN clients c ON c.id = s.client_id
+    WHERE s.id IN ({})
+"""
+INVOICE_FIELDS = ["invoice_id", "date", "seller_name", "client_name", "client_phone", "client_address",
+                  "phone_brand", "phone_model", "phone_imei", "quantity", "unit_price", "total_price",
+                  "payment_method"]
+
+# Ids per IN (...) list, well under SQLite's limit on bound parameters
+IDS_PER_QUERY = 500
+
+# Line item table: (heading, width in mm, alignment)
+ITEM_COLUMNS = [("Description", 100, 'L'), ("Qty", 20, 'C'), ("Unit Price", 30, 'R'), ("Amount", 30, 'R')]
+LINE_HEIGHT = 5     # mm per line of a wrapped description
+CELL_PADDING = 2    # mm between a description and its cell border
+CLOSING_HEIGHT = 45 # mm needed below the table for the total, payment and footer
+
+# Word widths shared by every invoice rendered in this process
+_measurer = TextMeasurer()
+
+def invoice_data_from_row(row):
+    """ The invoice_data dict generate_invoice_pdf expects, from an INVOICE_QUERY row """
+    data = dict(zip(INVOICE_FIELDS, row))
+    for key in ("client_name", "client_phone", "client_address"):
+        data[key] = data[key] or 'N/A'
+    data["payment_method"] = data["payment_method"] or 'other'
+    return data
+
+def fetch_invoice_data(sale_ids, conn=None):
+    """ Invoice data for each of sale_ids, keyed by sale id
+
+    One joined query per IDS_PER_QUERY ids instead of a lookup per table
+    per sale. Ids with no sale are left out of the result.
+    """
+    conn = conn or get_connection()
+    sale_ids = list(dict.fromkeys(sale_ids))
+    invoices = {}
+    for start in range(0, len(sale_ids), IDS_PER_QUERY):
+        chunk = sale_ids[start:start + IDS_PER_QUERY]
+        query = INVOICE_QUERY.format(", ".join("?" * len(chunk)))
+        for row in conn.execute(query, chunk):
+            invoices[row[0]] = invoice_data_from_row(row)
+    return invoices
+
+class InvoiceTemplate:
+    """ The part of every invoice that doesn't change: store header, logo and title
+
+    Built once from the store_info row: the store text is made PDF-safe and
+    laid out into a list of drawing steps, and the logo is decoded once, so
+    each invoice only replays the steps and reuses the decoded image. Use
+    get_invoice_template() for the shared instance, which is rebuilt only
+    when store_info or the logo file changes. Templates pickle, so worker
+    processes can be handed one instead of reading the database.
+    """
+
+    def __init__(self, store, logo_path=None):
+        self.store = store
+        self.logo_source = logo_path
+        path = logo_path or DEFAULT_LOGO_PATH
+        self.logo_path = path if os.path.exists(path) else None
+        self.logo_mtime = os.path.getmtime(path) if self.logo_path else None
+        self.logo_info = self.decode_logo() if self.logo_path else None
+        self.steps = self.layout(store)
+
+    @staticmethod
+    def layout(store):
+        """ Drawing steps for the header, as (pdf method name, args) pairs """
+        steps = [
+            ("set_font", ("Arial", 'B', 16)),
+            ("cell", (0, 10, pdf_text(store['name']), 0, 1, 'C')),
+            ("set_font", ("Arial", '', 12)),
+            ("cell", (0, 5, pdf_text(store['address']), 0, 1, 'C')),
+            ("cell", (0, 5, pdf_text(f"Phone: {store['phone']}"), 0, 1, 'C')),
+        ]
+        if store['email']:
+            steps.append(("cell", (0, 5, pdf_text(f"Email: {store['email']}"), 0, 1, 'C')))
+        steps += [
+            ("ln", (10,)),
+            # Invoice title
+            ("set_font", ("Arial", 'B', 14)),
+            ("cell", (0, 10, "INVOICE", 0, 1, 'C')),
+            ("ln", (5,)),
+        ]
+        return steps
+
+    def decode_logo(self):
+        """ The parsed image FPDF would otherwise re-read from disk for every invoice
+
+        Relies on FPDF 1.x keeping parsed images in FPDF.images keyed by
+        path (fpdf is pinned to 1.7.2 in requirements.txt).
+        """
+        probe = FPDF()
+        probe.add_page()
+        probe.image(self.logo_path, x=10, y=8, w=30)
+        images = getattr(probe, "images", None)
+        if not isinstance(images, dict) or self.logo_path not in images:
+            print("This fpdf version has no FPDF.images cache; "
+                  "the invoice logo will be read for every invoice")
+            return None
+        return images[self.logo_path]
+
+    def logo_changed(self):
+        path = self.logo_source or DEFAULT_LOGO_PATH
+        mtime = os.path.getmtime(path) if os.path.exists(path) else None
+        return mtime != self.logo_mtime
+
+    def draw(self, pdf):
+        """ Draw the logo and header at the top of pdf's current page """
+        if self.logo_path:
+            images = getattr(pdf, "images", None)
+            if self.logo_info is not None and isinstance(images, dict) and self.logo_path not in images:
+                # Register the decoded image so FPDF doesn't parse the file again
+                images[self.logo_path] = dict(self.logo_info, i=len(images) + 1)
+            pdf.image(self.logo_path, x=10, y=8, w=30)
+        for method, args in self.steps:
+            getattr(pdf, method)(*args)
+
+def read_store_info(conn=None):
+    """ Return (store dict, logo_path) from the store_info row """
+    conn = conn or get_connection()
+    row = conn.execute(
+        "SELECT name, address, phone, email, logo_path FROM store_info ORDER BY id LIMIT 1"
+    ).fetchone()
+    if row is None:
+        return {"name": "", "address": "", "phone": "", "email": None}, None
+    name, address, phone, email, logo_path = row
+    return {"name": name, "address": address, "phone": phone, "email": email}, logo_path
+
+_template = None
+_template_checked = None
+_template_lock = threading.Lock()
+
+def get_invoice_template(conn=None):
+    """ The shared InvoiceTemplate, rebuilt only when store_info or the logo changes
+
+    store_info is only read again after the database has been written to
+    (data_signature), and the template is only rebuilt if the row differs.
+    """
+    global _template, _template_checked
+    conn = conn or get_connection()
+    with _template_lock:
+        checked = (conn, data_signature(conn))
+        if _template is None or checked != _template_checked:
+            store, logo_path = read_store_info(conn)
+            if _template is None or (store, logo_path) != (_template.store, _template.logo_source):
+                _template = InvoiceTemplate(store, logo_path)
+            _template_checked = checked
+        if _template.logo_changed():
+            _template = InvoiceTemplate(_template.store, _template.logo_source)
+        return _template
+
+def invoice_items(invoice_data):
+    """ The invoice's line items as dicts of description, quantity, unit_price and amount
+
+    invoice_data can list several in 'items' (e.g. a phone and its
+    accessories); otherwise its single phone sale is the only item.
+    """
+    if invoice_data.get('items'):
+        return invoice_data['items']
+    return [{
+        "description": (f"{invoice_data['phone_brand']} {invoice_data['phone_model']}\n"
+                        f"IMEI: {invoice_data['phone_imei']}"),
+        "quantity": invoice_data['quantity'],
+        "unit_price": invoice_data['unit_price'],
+        "amount": invoice_data['total_price'],
+    }]
+
+def draw_item_header(pdf):
+    pdf.set_font("Arial", 'B', 10)
+    for heading, width, align in ITEM_COLUMNS:
+        pdf.cell(width, 6, txt=heading, border=1, ln=0, align=align)
+    pdf.ln()
+    pdf.set_font("Arial", size=10)
+
+def draw_items_table(pdf, items):
+    """ Draw the line items, continuing on a new page with the header repeated
+
+    Descriptions are wrapped with the shared TextMeasurer, so each word is
+    measured once rather than re-measuring the growing line. Rows are drawn
+    as one rectangle, the column rules and the text placed from cached
+    widths, which is much cheaper per row than four aligned cells.
+    """
+    desc_width = ITEM_COLUMNS[0][1]
+    table_width = sum(width for _, width, _ in ITEM_COLUMNS)
+    page_bottom = pdf.h - pdf.b_margin
+    # A description longer than a page is cut to what fits on one
+    max_lines = int((page_bottom - pdf.t_margin - 6) // LINE_HEIGHT)
+    
+    pdf.set_auto_page_break(False)
+    draw_item_header(pdf)
+    for item in items:
+        lines = _measurer.wrap(pdf, pdf_text(item['description']), desc_width - 2 * CELL_PADDING)
+        lines = lines[:max_lines]
+        row_height = max(6, len(lines) * LINE_HEIGHT + 1)
+        if pdf.get_y() + row_height > page_bottom:
+            pdf.add_page()
+            draw_item_header(pdf)
+        
+        x, y = pdf.get_x(), pdf.get_y()
+        pdf.rect(x, y, table_width, row_height)
+        for i, line in enumerate(lines):
+            pdf.text(x + CELL_PADDING, y + 4 + i * LINE_HEIGHT, line)
+        
+        left = x + desc_width
+        values = (str(item['quantity']), money(item['unit_price']), money(item['amount']))
+        for text, (_, width, align) in zip(values, ITEM_COLUMNS[1:]):
+            pdf.line(left, y, left, y + row_height)
+            text_width = _measurer.width(pdf, text)
+            if align == 'C':
+                offset = (width - text_width) / 2
+            else:
+                offset = width - CELL_PADDING - text_width
+            pdf.text(left + offset, y + 4, text)
+            left += width
+        pdf.set_xy(x, y + row_height)
+    pdf.set_auto_page_break(True, pdf.b_margin)
+
+def generate_invoice_pdf(invoice_data, invoices_dir=INVOICES_DIR, template=None):
+    """ Render one invoice to a PDF in invoices_dir and return its path
+
+    invoice_data holds the invoice id, date, seller and client fields and
+    either the single phone sale or a list of 'items' (see invoice_items).
+    """
     try:
+        template = template or get_invoice_template()
+        
         # Create PDF
         pdf = FPDF()
         pdf.add_page()
         pdf.set_font("Arial", size=12)
         
-        # Add logo if exists
-        logo_path = 'data/store_logo.png'  # You can add a logo file to this path
-        if os.path.exists(logo_path):
-            pdf.image(logo_path, x=10, y=8, w=30)
-        
-        # Store info
-        pdf.set_font("Arial", 'B', 16)
-        pdf.cell(0, 10, txt=invoice_data['store_name'], ln=1, align='C')
-        pdf.set_font("Arial", size=12)
-        pdf.cell(0, 5, txt=invoice_data['store_address'], ln=1, align='C')
-        pdf.cell(0, 5, txt=f"Phone: {invoice_data['store_phone']}", ln=1, align='C')
-        if invoice_data['store_email']:
-            pdf.cell(0, 5, txt=f"Email: {invoice_data['store_email']}", ln=1, align='C')
-        pdf.ln(10)
-        
-        # Invoice title
-        pdf.set_font("Arial", 'B', 14)
-        pdf.cell(0, 10, txt="INVOICE", ln=1, align='C')
-        pdf.ln(5)
+        # Logo, store info and title
+        template.draw(pdf)
         
         # Invoice details
         pdf.set_font("Arial", size=10)
@@ -38,10 +264,10 @@ def generate_invoice_pdf(invoice_data):
         pdf.cell(50, 5, txt=str(invoice_data['invoice_id']), ln=1)
         
         pdf.cell(40, 5, txt="Date:", ln=0)
-        pdf.cell(50, 5, txt=invoice_data['date'], ln=1)
+        pdf.cell(50, 5, txt=pdf_text(invoice_data['date']), ln=1)
         
         pdf.cell(40, 5, txt="Seller:", ln=0)
-        pdf.cell(50, 5, txt=invoice_data['seller_name'], ln=1)
+        pdf.cell(50, 5, txt=pdf_text(invoice_data['seller_name']), ln=1)
         pdf.ln(5)
         
         # Client info
@@ -49,79 +275,33 @@ def generate_invoice_pdf(invoice_data):
         pdf.cell(0, 5, txt="Bill To:", ln=1)
         pdf.set_font("Arial", size=10)
         pdf.cell(40, 5, txt="Name:", ln=0)
-        pdf.cell(50, 5, txt=invoice_data['client_name'], ln=1)
+        pdf.cell(50, 5, txt=pdf_text(invoice_data['client_name']), ln=1)
         
         if invoice_data['client_phone'] != 'N/A':
             pdf.cell(40, 5, txt="Phone:", ln=0)
-            pdf.cell(50, 5, txt=invoice_data['client_phone'], ln=1)
+            pdf.cell(50, 5, txt=pdf_text(invoice_data['client_phone']), ln=1)
             
         if invoice_data['client_address'] != 'N/A':
             pdf.cell(40, 5, txt="Address:", ln=0)
-            pdf.cell(50, 5, txt=invoice_data['client_address'], ln=1)
+            pdf.cell(50, 5, txt=pdf_text(invoice_data['client_address']), ln=1)
         pdf.ln(10)
         
         # Items table
         pdf.set_font("Arial", 'B', 12)
         pdf.cell(0, 5, txt="Item Details", ln=1)
         pdf.ln(2)
-        
-        # Table header
-        pdf.set_font("Arial", 'B', 10)
-        pdf.cell(100, 6, txt="Description", border=1, ln=0)
-        pdf.cell(20, 6, txt="Qty", border=1, ln=0, align='C')
-        pdf.cell(30, 6, txt="Unit Price", border=1, ln=0, align='R')
-        pdf.cell(30, 6, txt="Amount", border=1, ln=1, align='R')
-        
-        # Table row
-        pdf.set_font("Arial", size=10)
-        description = f"{invoice_data['phone_brand']} {invoice_data['phone_model']}\nIMEI: {invoice_data['phone_imei']}"
-        
-        # Split description into lines that fit in the cell
-        max_width = 100
-        line_height = 5
-        desc_lines = []
-        words = description.split()
-        current_line = ""
-        
-        for word in words:
-            test_line = current_line + " " + word if current_line else word
-            if pdf.get_string_width(test_line) < max_width:
-                current_line = test_line
-            else:
-                desc_lines.append(current_line)
-                current_line = word
-        if current_line:
-            desc_lines.append(current_line)
-        
-        # Calculate row height based on description lines
-        row_height = max(6, len(desc_lines) * line_height)
-        
-        # Description cell
-        pdf.cell(100, row_height, txt="", border='LTR', ln=0)
-        # Save x,y position after description cell
-        x, y = pdf.get_x(), pdf.get_y()
-        
-        # Print each line of description
-        for i, line in enumerate(desc_lines):
-            pdf.text(x + 2, y + 3 + (i * line_height), line)
-        
-        # Other cells
-        pdf.set_xy(x + 100, y)
-        pdf.cell(20, row_height, txt=str(invoice_data['quantity']), border='LTR', ln=0, align='C')
-        pdf.cell(30, row_height, txt=f"${invoice_data['unit_price']:.2f}", border='LTR', ln=0, align='R')
-        pdf.cell(30, row_height, txt=f"${invoice_data['total_price']:.2f}", border='LTR', ln=1, align='R')
-        
-        # Bottom border for the row
-        pdf.cell(100, 0, border='LBR', ln=0)
-        pdf.cell(20, 0, border='LBR', ln=0)
-        pdf.cell(30, 0, border='LBR', ln=0)
-        pdf.cell(30, 0, border='LBR', ln=1)
+        items = invoice_items(invoice_data)
+        draw_items_table(pdf, items)
         pdf.ln(5)
         
+        # Keep the total and footer together on one page
+        if pdf.get_y() + CLOSING_HEIGHT > pdf.h - pdf.b_margin:
+            pdf.add_page()
+        
         # Total
         pdf.set_font("Arial", 'B', 12)
         pdf.cell(150, 8, txt="Total:", ln=0, align='R')
-        pdf.cell(30, 8, txt=f"${invoice_data['total_price']:.2f}", ln=1, align='R')
+        pdf.cell(30, 8, txt=money(sum(item['amount'] for item in items)), ln=1, align='R')
         
         # Payment method
         pdf.set_font("Arial", size=10)
@@ -134,9 +314,7 @@ def generate_invoice_pdf(invoice_data):
         pdf.cell(0, 5, txt="This is a computer generated invoice.", ln=1, align='C')
         
         # Create invoices directory if not exists
-        invoices_dir = 'data/invoices'
-        if not os.path.exists(invoices_dir):
-            os.makedirs(invoices_dir)
+        os.makedirs(invoices_dir, exist_ok=True)
         
         # Save the PDF
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -146,4 +324,96 @@ def generate_invoice_pdf(invoice_data):
         return pdf_path
         
     except Exception as e:
-        raise Exception(f"Failed to generate invoice: {str(e)}")
\ No newline at end of file
+        raise Exception(f"Failed to generate invoice: {str(e)}")
+
+
+class InvoiceBatchResult:
+    """ Outcome of generate_invoices: one entry per sale id, in paths or failed """
+
+    def __init__(self):
+        self.paths = {}
+        self.failed = {}
+        self.merged_path = None
+        self.elapsed = 0.0
+
+    def __str__(self):
+        text = f"Generated {len(self.paths)} invoices in {self.elapsed:.1f}s"
+        if self.failed:
+            text += f", {len(self.failed)} failed"
+        if self.merged_path:
+            text += f", merged into {self.merged_path}"
+        return text
+
+# The template a batch worker process was started with
+_worker_template = None
+
+def _init_invoice_worker(template):
+    global _worker_template
+    _worker_template = template
+
+def _render_batch_invoice(invoice_data, invoices_dir):
+    return generate_invoice_pdf(invoice_data, invoices_dir, _worker_template)
+
+def generate_invoices(sale_ids, invoices_dir=INVOICES_DIR, merge_path=None, max_workers=None,
+                      on_progress=None, conn=None):
+    """ Generate an invoice PDF for each sale id in worker processes
+
+    The data for every sale is fetched up front with fetch_invoice_data
+    and each worker is started with the invoice template, so the workers
+    only render and never touch the database. A sale that
+    is missing or fails to render is recorded in result.failed and the
+    rest carry on. With merge_path, the invoices that succeeded are also
+    combined, in sale_ids order, into one printable file (needs pypdf).
+    on_progress(done, total, sale_id, error) is called in the calling
+    thread as each invoice finishes; error is None on success.
+    """
+    start = time.perf_counter()
+    result = InvoiceBatchResult()
+    sale_ids = list(dict.fromkeys(sale_ids))
+    invoices = fetch_invoice_data(sale_ids, conn)
+    total = len(sale_ids)
+    done = 0
+
+    def finished(sale_id, error=None):
+        nonlocal done
+        done += 1
+        if error is not None:
+            result.failed[sale_id] = str(error)
+        if on_progress:
+            on_progress(done, total, sale_id, error)
+
+    for sale_id in sale_ids:
+        if sale_id not in invoices:
+            finished(sale_id, LookupError(f"Sale {sale_id} not found"))
+
+    if invoices:
+        template = get_invoice_template(conn)
+        workers = max(1, min(max_workers or os.cpu_count() or 1, len(invoices)))
+        with spawn_pool(workers, _init_invoice_worker, (template,)) as pool:
+            futures = {pool.submit(_render_batch_invoice, data, invoices_dir): sale_id
+                       for sale_id, data in invoices.items()}
+            for future in as_completed(futures):
+                sale_id = futures[future]
+                try:
+                    result.paths[sale_id] = future.result()
+                except Exception as e:
+                    finished(sale_id, e)
+                else:
+                    finished(sale_id)
+
+    if merge_path and result.paths:
+        merge_invoice_pdfs([result.paths[i] for i in sale_ids if i in result.paths], merge_path)
+        result.merged_path = merge_path
+
+    result.elapsed = time.perf_counter() - start
+    return result
+
+def merge_invoice_pdfs(pdf_paths, merge_path):
+    """ Combine invoice PDFs, in order, into one file for printing """
+    writer = PdfWriter()
+    for path in pdf_paths:
+        writer.append(path)
+    os.makedirs(os.path.dirname(merge_path) or ".", exist_ok=True)
+    with open(merge_path, "wb") as f:
+        writer.write(f)
+    return merge_path
@@ -0,0 +1,47 @@
+# lazy_imports.py - Defer heavy optional imports until a feature is first used
+import importlib
+import threading
+
+_lock = threading.Lock()
+
+
+class LazyImport:
+    """Stand-in for a module (or a name inside one) that imports on first use
+
+    `qrcode = lazy_import('qrcode')` costs nothing at startup; the real
+    import happens the first time an attribute is read or the object is
+    called, e.g. `qrcode.QRCode(...)` or `FPDF()`.
+    """
+
+    def __init__(self, module_name, attr=None):
+        self._module_name = module_name
+        self._attr = attr
+        self._target = None
+
+    def _load(self):
+        if self._target is None:
+            with _lock:
+                if self._target is None:
+                    module = importlib.import_module(self._module_name)
+                    self._target = getattr(module, self._attr) if self._attr else module
+        return self._target
+
+    @property
+    def is_loaded(self):
+        return self._target is not None
+
+    def __getattr__(self, name):
+        return getattr(self._load(), name)
+
+    def __call__(self, *args, **kwargs):
+        return self._load()(*args, **kwargs)
+
+    def __repr__(self):
+        name = f"{self._module_name}.{self._attr}" if self._attr else self._module_name
+        state = "loaded" if self.is_loaded else "not loaded"
+        return f"<lazy import {name} ({state})>"
+
+
+def lazy_import(module_name, attr=None):
+    """Return a lazy stand-in for a module, or for attr within that module"""
+    return LazyImport(module_name, attr)
@@ -5,6 +5,7 @@ import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 import sys
 import os
+import multiprocessing
 
 # Add the src directory to the path to ensure imports work
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
@@ -216,6 +217,10 @@ def start_main_app(user_data):
 
 
 if __name__ == "__main__":
+    # This is the PyInstaller entry point (build.py); spawned workers for
+    # label sheets re-run the exe and must stop here instead of opening the app
+    multiprocessing.freeze_support()
+
     # Test the application directly
     test_user_data = {
         'username': 'TestUser',
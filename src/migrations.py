@@ -0,0 +1,329 @@
+# migrations.py - Versioned schema migrations tracked by PRAGMA user_version
+import sqlite3
+from date_keys import DAY_KEY_SQL, SALE_DAY_SQL, UNDATED_DAY
+
+
+def get_schema_version(conn):
+    """ Return the schema version stored in the database header """
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def column_exists(cursor, table, column):
+    """ Check whether a table already has a column """
+    cursor.execute(f"PRAGMA table_info({table})")
+    return any(row[1] == column for row in cursor.fetchall())
+
+
+def add_column(cursor, table, column, definition):
+    """ Add a column only if it is missing, so migrations can be re-run safely """
+    if not column_exists(cursor, table, column):
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+
+def migration_1_base_schema(cursor):
+    """ Base tables and default rows """
+    # Imported here to avoid a circular import with database.py
+    from database import SCHEMA_SQL, insert_default_rows
+
+    for sql in SCHEMA_SQL:
+        cursor.execute(sql)
+    insert_default_rows(cursor)
+
+
+def migration_2_report_indexes(cursor):
+    """ Secondary indexes used by the sales/stock reports and phone list """
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_sales_sale_date ON sales (sale_date)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_sales_phone_id ON sales (phone_id, sale_date)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_sales_client_id ON sales (client_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_sales_user_id ON sales (user_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_phones_brand_model ON phones (brand, model)")
+    cursor.execute("ANALYZE")
+
+
+def fts5_available(cursor):
+    """ Check whether this SQLite build ships the FTS5 extension """
+    try:
+        cursor.execute("CREATE VIRTUAL TABLE temp.fts5_probe USING fts5(x)")
+        cursor.execute("DROP TABLE temp.fts5_probe")
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+def migration_3_phone_search_index(cursor):
+    """ FTS5 index over the searchable phone columns """
+    if not fts5_available(cursor):
+        # Search falls back to LIKE queries without the index
+        print("FTS5 not available, phone search will use LIKE")
+        return
+
+    cursor.execute("""
+    CREATE VIRTUAL TABLE IF NOT EXISTS phones_fts USING fts5(
+        brand, model, imei, color, storage, description,
+        content='phones', content_rowid='id', prefix='2 3'
+    )
+    """)
+
+    # Keep the index in sync with the phones table
+    cursor.execute("""
+    CREATE TRIGGER IF NOT EXISTS phones_fts_insert AFTER INSERT ON phones BEGIN
+        INSERT INTO phones_fts (rowid, brand, model, imei, color, storage, description)
+        VALUES (new.id, new.brand, new.model, new.imei, new.color, new.storage, new.description);
+    END
+    """)
+    cursor.execute("""
+    CREATE TRIGGER IF NOT EXISTS phones_fts_delete AFTER DELETE ON phones BEGIN
+        INSERT INTO phones_fts (phones_fts, rowid, brand, model, imei, color, storage, description)
+        VALUES ('delete', old.id, old.brand, old.model, old.imei, old.color, old.storage, old.description);
+    END
+    """)
+    cursor.execute("""
+    CREATE TRIGGER IF NOT EXISTS phones_fts_update
+    AFTER UPDATE OF brand, model, imei, color, storage, description ON phones BEGIN
+        INSERT INTO phones_fts (phones_fts, rowid, brand, model, imei, color, storage, description)
+        VALUES ('delete', old.id, old.brand, old.model, old.imei, old.color, old.storage, old.description);
+        INSERT INTO phones_fts (rowid, brand, model, imei, color, storage, description)
+        VALUES (new.id, new.brand, new.model, new.imei, new.color, new.storage, new.description);
+    END
+    """)
+
+    # Index the phones that already exist
+    cursor.execute("INSERT INTO phones_fts (phones_fts) VALUES ('rebuild')")
+
+
+def create_sales_daily_rollup(cursor, day_type, day_of):
+    """ Create and backfill sales_daily with its triggers on sales
+
+    day_of is a SQL template turning a sale_date expression into the day
+    column, e.g. "date({})". sale_date is free text, so a sale whose date
+    doesn't parse has no day; it is left out of the rollup rather than
+    failing the migration or the INSERT that records it.
+    """
+    # payment_method is stored as '' instead of NULL so it can be part of the key
+    cursor.execute(f"""
+    CREATE TABLE IF NOT EXISTS sales_daily (
+        day {day_type} NOT NULL,
+        phone_id INTEGER NOT NULL,
+        payment_method TEXT NOT NULL,
+        user_id INTEGER NOT NULL,
+        sales_count INTEGER NOT NULL,
+        total_quantity INTEGER NOT NULL,
+        total_sales REAL NOT NULL,
+        PRIMARY KEY (day, phone_id, payment_method, user_id)
+    ) WITHOUT ROWID
+    """)
+
+    add_sale = f"""
+        INSERT INTO sales_daily (day, phone_id, payment_method, user_id,
+                                 sales_count, total_quantity, total_sales)
+        SELECT {day_of.format('new.sale_date')}, new.phone_id, COALESCE(new.payment_method, ''),
+               new.user_id, 1, new.quantity, new.total_price
+        WHERE {day_of.format('new.sale_date')} IS NOT NULL
+        ON CONFLICT (day, phone_id, payment_method, user_id) DO UPDATE SET
+            sales_count = sales_count + 1,
+            total_quantity = total_quantity + excluded.total_quantity,
+            total_sales = total_sales + excluded.total_sales;
+    """
+    remove_sale = f"""
+        UPDATE sales_daily SET
+            sales_count = sales_count - 1,
+            total_quantity = total_quantity - old.quantity,
+            total_sales = total_sales - old.total_price
+        WHERE day = {day_of.format('old.sale_date')} AND phone_id = old.phone_id
+          AND payment_method = COALESCE(old.payment_method, '') AND user_id = old.user_id;
+        DELETE FROM sales_daily
+        WHERE day = {day_of.format('old.sale_date')} AND phone_id = old.phone_id
+          AND payment_method = COALESCE(old.payment_method, '') AND user_id = old.user_id
+          AND sales_count <= 0;
+    """
+
+    cursor.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS sales_daily_insert AFTER INSERT ON sales BEGIN
+        {add_sale}
+    END
+    """)
+    cursor.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS sales_daily_delete AFTER DELETE ON sales BEGIN
+        {remove_sale}
+    END
+    """)
+    cursor.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS sales_daily_update
+    AFTER UPDATE OF sale_date, phone_id, payment_method, user_id, quantity, total_price
+    ON sales BEGIN
+        {remove_sale}
+        {add_sale}
+    END
+    """)
+
+    # Backfill from the sales that already exist
+    cursor.execute("DELETE FROM sales_daily")
+    cursor.execute(f"""
+    INSERT INTO sales_daily (day, phone_id, payment_method, user_id,
+                             sales_count, total_quantity, total_sales)
+    SELECT {day_of.format('sale_date')}, phone_id, COALESCE(payment_method, ''), user_id,
+           COUNT(*), SUM(quantity), SUM(total_price)
+    FROM sales
+    WHERE {day_of.format('sale_date')} IS NOT NULL
+    GROUP BY 1, 2, 3, 4
+    """)
+
+
+def migration_4_sales_daily_rollup(cursor):
+    """ Daily sales rollup kept current by triggers on sales """
+    create_sales_daily_rollup(cursor, "TEXT", "date({})")
+
+
+def migration_5_sale_day_keys(cursor):
+    """ Indexed integer day key on sales; sales_daily rekeyed by it """
+    add_column(cursor, "sales", "sale_day", "INTEGER")
+    cursor.execute(f"UPDATE sales SET sale_day = {DAY_KEY_SQL.format('sale_date')}")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_sales_sale_day ON sales(sale_day)")
+    create_sale_day_triggers(cursor, DAY_KEY_SQL)
+
+    # Rebuild the rollup keyed by the integer day instead of date text
+    rebuild_sales_daily_rollup(cursor)
+    cursor.execute("ANALYZE")
+
+
+def create_sale_day_triggers(cursor, day_key_sql):
+    """ Keep sales.sale_day in step with sale_date using day_key_sql """
+    # The triggers only write sale_day, so they never fire each other
+    for event in ("INSERT", "UPDATE OF sale_date"):
+        name = "sales_sale_day_" + event.split()[0].lower()
+        cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+        cursor.execute(f"""
+        CREATE TRIGGER {name} AFTER {event} ON sales BEGIN
+            UPDATE sales SET sale_day = {day_key_sql.format('new.sale_date')} WHERE id = new.id;
+        END
+        """)
+
+
+def rebuild_sales_daily_rollup(cursor):
+    """ Drop sales_daily and its triggers and create them again by day key """
+    for trigger in ("sales_daily_insert", "sales_daily_delete", "sales_daily_update"):
+        cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    cursor.execute("DROP TABLE IF EXISTS sales_daily")
+    create_sales_daily_rollup(cursor, "INTEGER", DAY_KEY_SQL)
+
+
+def migration_6_inventory_totals(cursor):
+    """ Per-brand stock totals kept by triggers, and a low-stock partial index """
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS inventory_totals (
+        brand TEXT PRIMARY KEY,
+        phone_count INTEGER NOT NULL,
+        unit_count INTEGER NOT NULL,
+        stock_value REAL NOT NULL
+    ) WITHOUT ROWID
+    """)
+
+    add_phone = """
+        INSERT INTO inventory_totals (brand, phone_count, unit_count, stock_value)
+        VALUES (new.brand, 1, COALESCE(new.quantity, 0), new.price * COALESCE(new.quantity, 0))
+        ON CONFLICT (brand) DO UPDATE SET
+            phone_count = phone_count + 1,
+            unit_count = unit_count + excluded.unit_count,
+            stock_value = stock_value + excluded.stock_value;
+    """
+    remove_phone = """
+        UPDATE inventory_totals SET
+            phone_count = phone_count - 1,
+            unit_count = unit_count - COALESCE(old.quantity, 0),
+            stock_value = stock_value - old.price * COALESCE(old.quantity, 0)
+        WHERE brand = old.brand;
+        DELETE FROM inventory_totals WHERE brand = old.brand AND phone_count <= 0;
+    """
+
+    cursor.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS inventory_totals_insert AFTER INSERT ON phones BEGIN
+        {add_phone}
+    END
+    """)
+    cursor.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS inventory_totals_delete AFTER DELETE ON phones BEGIN
+        {remove_phone}
+    END
+    """)
+    cursor.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS inventory_totals_update
+    AFTER UPDATE OF brand, price, quantity ON phones BEGIN
+        {remove_phone}
+        {add_phone}
+    END
+    """)
+
+    # Backfill from the phones that already exist
+    cursor.execute("DELETE FROM inventory_totals")
+    cursor.execute("""
+    INSERT INTO inventory_totals (brand, phone_count, unit_count, stock_value)
+    SELECT brand, COUNT(*), SUM(COALESCE(quantity, 0)), SUM(price * COALESCE(quantity, 0))
+    FROM phones
+    GROUP BY brand
+    """)
+
+    # Covers the low-stock report; the WHERE must match the report's filter exactly
+    cursor.execute("""
+    CREATE INDEX IF NOT EXISTS idx_phones_low_stock
+    ON phones(brand, model, imei, price, quantity) WHERE quantity < 5
+    """)
+
+
+def migration_7_rollup_skips_undated_sales(cursor):
+    """ sales_daily triggers that skip sales whose date doesn't parse """
+    # Databases migrated before the guard reject such sales outright
+    rebuild_sales_daily_rollup(cursor)
+
+
+def migration_8_undated_sale_day(cursor):
+    """ Non-NULL day key for undated sales, so the sales list pages on (sale_day, id) """
+    cursor.execute(f"UPDATE sales SET sale_day = {UNDATED_DAY} WHERE sale_day IS NULL")
+    create_sale_day_triggers(cursor, SALE_DAY_SQL)
+
+
+# Ordered list of migrations; the position in the list is the version number
+MIGRATIONS = [
+    migration_1_base_schema,
+    migration_2_report_indexes,
+    migration_3_phone_search_index,
+    migration_4_sales_daily_rollup,
+    migration_5_sale_day_keys,
+    migration_6_inventory_totals,
+    migration_7_rollup_skips_undated_sales,
+    migration_8_undated_sale_day,
+]
+
+LATEST_VERSION = len(MIGRATIONS)
+
+
+def run_migrations(conn, target_version=LATEST_VERSION):
+    """ Bring the schema up to target_version
+
+    Returns the version the database ended up at. When the schema is already
+    current this only reads PRAGMA user_version and does no other work.
+    """
+    current = get_schema_version(conn)
+    if current >= target_version:
+        return current
+
+    # Run each migration in its own transaction so a failure leaves the
+    # database at the last good version
+    isolation_level = conn.isolation_level
+    conn.isolation_level = None
+    try:
+        cursor = conn.cursor()
+        for version in range(current + 1, target_version + 1):
+            migration = MIGRATIONS[version - 1]
+            try:
+                cursor.execute("BEGIN")
+                migration(cursor)
+                cursor.execute(f"PRAGMA user_version = {version}")
+                cursor.execute("COMMIT")
+                print(f"Applied migration {version}: {migration.__doc__.strip()}")
+            except sqlite3.Error:
+                cursor.execute("ROLLBACK")
+                raise
+    finally:
+        conn.isolation_level = isolation_level
+
+    return get_schema_version(conn)
@@ -0,0 +1,193 @@
+# paged_list.py - Keyset-paginated data source and a Treeview that loads on scroll
+import sqlite3
+import tkinter as tk
+from tkinter import messagebox
+
+
+class KeysetPager:
+    """Read a query one page at a time using keyset pagination
+
+    Rows are ordered by order_columns (which must end with a unique column,
+    e.g. id) and each page starts right after the key of the last row seen,
+    so fetching page N costs the same as fetching page 1 - there is no OFFSET.
+
+    conn is a connection, or a function returning one (e.g. get_connection)
+    for a pager whose pages are fetched on whichever worker thread is free.
+    """
+
+    def __init__(self, conn, columns, from_sql, order_columns, where_sql="",
+                 params=(), descending=False, page_size=200, count_from_sql=None):
+        self.conn = conn
+        self.columns = columns
+        self.from_sql = from_sql
+        # Counting can usually skip the joins needed for display
+        self.count_from_sql = count_from_sql or from_sql
+        self.order_columns = order_columns
+        self.where_sql = where_sql
+        self.params = tuple(params)
+        self.descending = descending
+        self.page_size = page_size
+
+        self.last_key = None
+        self.exhausted = False
+        self._total = None
+
+    def connection(self):
+        """The connection to query on from the calling thread"""
+        if isinstance(self.conn, sqlite3.Connection):
+            return self.conn
+        return self.conn()
+
+    def count(self):
+        """Total number of matching rows (computed once, rows aren't fetched)"""
+        if self._total is None:
+            where = f"WHERE {self.where_sql}" if self.where_sql else ""
+            cursor = self.connection().execute(
+                f"SELECT COUNT(*) FROM {self.count_from_sql} {where}", self.params
+            )
+            self._total = cursor.fetchone()[0]
+        return self._total
+
+    def next_page(self, size=None):
+        """Return the next page of rows, or [] when there are no more"""
+        if self.exhausted:
+            return []
+        size = size or self.page_size
+
+        conditions = [f"({self.where_sql})"] if self.where_sql else []
+        params = list(self.params)
+        if self.last_key is not None:
+            op = "<" if self.descending else ">"
+            keys = ", ".join(self.order_columns)
+            marks = ", ".join("?" * len(self.order_columns))
+            conditions.append(f"({keys}) {op} ({marks})")
+            params.extend(self.last_key)
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        direction = " DESC" if self.descending else ""
+        order_by = ", ".join(col + direction for col in self.order_columns)
+
+        # The order columns are selected after the display columns so the
+        # last row's key can be read back without knowing the column layout
+        cursor = self.connection().execute(f"""
+            SELECT {self.columns}, {', '.join(self.order_columns)}
+            FROM {self.from_sql}
+            {where}
+            ORDER BY {order_by}
+            LIMIT ?
+        """, params + [size])
+        rows = cursor.fetchall()
+
+        if len(rows) < size:
+            self.exhausted = True
+        if rows:
+            key_len = len(self.order_columns)
+            self.last_key = rows[-1][-key_len:]
+            rows = [row[:-key_len] for row in rows]
+        return rows
+
+
+class PagedTreeview:
+    """Show a KeysetPager in a Treeview, fetching more rows as the user scrolls
+
+    Only the visible window plus a prefetch margin is loaded up front; the
+    next page is fetched when the scrollbar gets close to the bottom. With
+    an executor (background_tasks.BackgroundExecutor) pages are fetched on
+    a worker thread while busy runs, and a page that arrives after the
+    list was reloaded is dropped.
+    """
+
+    def __init__(self, tree, scrollbar, format_row=None, prefetch_rows=100,
+                 on_count=None, executor=None, busy=None, error_title="Failed to load rows"):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.format_row = format_row
+        self.prefetch_rows = prefetch_rows
+        self.on_count = on_count
+        self.executor = executor
+        self.busy = busy
+        self.error_title = error_title
+
+        self.pager = None
+        self.loaded = 0
+        self._loading = False
+        self._task = None
+
+        self.tree.configure(yscrollcommand=self._on_scroll)
+
+    def load(self, pager):
+        """Replace the contents with the first window of a new pager"""
+        self.reset()
+        self.pager = pager
+
+        visible_rows = int(self.tree.cget("height") or 10)
+        self._fetch(max(pager.page_size, visible_rows + self.prefetch_rows))
+
+    def reset(self):
+        """Clear the tree and detach from the current pager"""
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        self.pager = None
+        self.loaded = 0
+        self._loading = False
+        self.tree.delete(*self.tree.get_children())
+
+    def load_more(self):
+        """Fetch the next page, if there is one"""
+        if self.pager is None or self.pager.exhausted:
+            self._loading = False
+            return
+        self._fetch()
+
+    def _fetch(self, size=None):
+        pager = self.pager
+        self._loading = True
+
+        def fetch():
+            # The count is cached by the pager, so it is only queried here
+            pager.count()
+            return pager.next_page(size)
+
+        def done(rows):
+            if pager is self.pager:
+                self._task = None
+                self._loading = False
+                self._append(rows)
+
+        def failed(error):
+            if pager is self.pager:
+                self._task = None
+                self._loading = False
+                messagebox.showerror("Database Error", f"{self.error_title}: {error}")
+
+        if self.executor is None:
+            try:
+                rows = fetch()
+            except sqlite3.Error as e:
+                failed(e)
+            else:
+                done(rows)
+        else:
+            self._task = self.executor.submit(fetch, on_success=done, on_error=failed,
+                                              busy=self.busy)
+
+    def _append(self, rows):
+        for row in rows:
+            values = self.format_row(row) if self.format_row else row
+            self.tree.insert("", tk.END, values=values)
+        self.loaded += len(rows)
+        if self.on_count and self.pager is not None:
+            self.on_count(self.loaded, self.pager.count())
+
+    def _on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+
+        if self.pager is None or self.pager.exhausted or self._loading:
+            return
+
+        # Prefetch once fewer than prefetch_rows remain below the view
+        remaining = (1.0 - float(last)) * self.loaded
+        if remaining < self.prefetch_rows:
+            self._loading = True
+            self.tree.after_idle(self.load_more)
@@ -0,0 +1,262 @@
+# pdf_table.py - Paginated table rendering for PDF reports
+import time
+from itertools import chain, islice
+from bulk_export import ExportResult
+from lazy_imports import lazy_import
+
+FPDF = lazy_import('fpdf', 'FPDF')
+
+CELL_PADDING = 2  # mm of space added to each measured column width
+
+
+def money(value):
+    """Format a number as $1,234.50"""
+    return f"${value:,.2f}"
+
+
+def pdf_text(value):
+    """Text the core PDF fonts can draw (they only cover Latin-1)"""
+    if value is None:
+        return ""
+    return str(value).encode("latin-1", "replace").decode("latin-1")
+
+
+class TextMeasurer:
+    """Memoized string widths per font, for wrapping a lot of text
+
+    FPDF measures a string by adding up its character widths on every call,
+    so wrapping by measuring a growing line costs time quadratic in its
+    length. Here each word is measured once per (family, style, size) and
+    a line's width is the sum of its words and spaces. A font's cache is
+    dropped once it holds max_words entries, since IMEIs and names are
+    rarely repeated.
+    """
+
+    def __init__(self, max_words=20000):
+        self.max_words = max_words
+        self._widths = {}
+
+    def font_widths(self, pdf):
+        key = (pdf.font_family, pdf.font_style, pdf.font_size_pt)
+        widths = self._widths.get(key)
+        if widths is None or len(widths) >= self.max_words:
+            widths = self._widths[key] = {}
+        return widths
+
+    def width(self, pdf, text):
+        widths = self.font_widths(pdf)
+        width = widths.get(text)
+        if width is None:
+            width = widths[text] = pdf.get_string_width(text)
+        return width
+
+    def wrap(self, pdf, text, max_width):
+        """Split text into lines no wider than max_width; newlines are kept
+
+        Words wider than a whole line are broken between characters.
+        """
+        widths = self.font_widths(pdf)
+
+        def measure(word):
+            width = widths.get(word)
+            if width is None:
+                width = widths[word] = pdf.get_string_width(word)
+            return width
+
+        space = measure(" ")
+        lines = []
+        for paragraph in str(text).split("\n"):
+            line, line_width = [], 0.0
+            for word in paragraph.split():
+                word_width = measure(word)
+                if word_width > max_width:
+                    pieces = self.break_word(word, max_width, measure)
+                    word, word_width = pieces.pop()
+                    if line:
+                        lines.append(" ".join(line))
+                    lines.extend(piece for piece, _ in pieces)
+                    line, line_width = [], 0.0
+                needed = word_width + (space if line else 0)
+                if line and line_width + needed > max_width:
+                    lines.append(" ".join(line))
+                    line, line_width = [word], word_width
+                else:
+                    line.append(word)
+                    line_width += needed
+            lines.append(" ".join(line))
+        return lines
+
+    @staticmethod
+    def break_word(word, max_width, measure):
+        """(piece, width) chunks of a word that fit max_width each"""
+        pieces = []
+        piece, piece_width = "", 0.0
+        for ch in word:
+            ch_width = measure(ch)
+            if piece and piece_width + ch_width > max_width:
+                pieces.append((piece, piece_width))
+                piece, piece_width = "", 0.0
+            piece += ch
+            piece_width += ch_width
+        pieces.append((piece, piece_width))
+        return pieces
+
+
+class PdfExportResult(ExportResult):
+    """Summary of a PDF report render"""
+
+    def __init__(self, file_path):
+        super().__init__(file_path)
+        self.pages = 0
+
+    @property
+    def pages_per_second(self):
+        if self.elapsed <= 0:
+            return 0.0
+        return self.pages / self.elapsed
+
+    def __str__(self):
+        return (f"Rendered {self.rows_exported} rows on {self.pages} pages to {self.file_path} "
+                f"in {self.elapsed:.1f}s ({self.pages_per_second:,.1f} pages/s)")
+
+
+class PdfTable:
+    """Render rows as a table that flows over as many pages as it needs
+
+    Column widths are measured from the header and the first sample_size
+    rows, then scaled to the page width; longer values later on are cut
+    with "..." rather than spilling into the next column. The header is
+    repeated at the top of every page. Rows are pulled from the iterator
+    one page at a time, so a cursor can be passed in directly.
+
+    formatters maps a column index to a function turning a value into text
+    (e.g. money); aligns maps a column index to 'L', 'C' or 'R'.
+    """
+
+    def __init__(self, columns, formatters=None, aligns=None, font_family="Arial",
+                 font_size=9, row_height=6, sample_size=200):
+        self.columns = list(columns)
+        self.formatters = formatters or {}
+        self.aligns = aligns or {}
+        self.font_family = font_family
+        self.font_size = font_size
+        self.row_height = row_height
+        self.sample_size = sample_size
+        self.widths = None
+
+    def format_row(self, row):
+        formatters = self.formatters
+        return [pdf_text(formatters[i](value) if i in formatters and value is not None else value)
+                for i, value in enumerate(row)]
+
+    def measure(self, pdf, sample):
+        """Natural column widths in mm for the header and the sample rows"""
+        pdf.set_font(self.font_family, 'B', self.font_size)
+        widths = [pdf.get_string_width(pdf_text(name)) for name in self.columns]
+        pdf.set_font(self.font_family, '', self.font_size)
+        for row in sample:
+            for i, text in enumerate(row):
+                width = pdf.get_string_width(text)
+                if width > widths[i]:
+                    widths[i] = width
+        return [width + 2 * CELL_PADDING for width in widths]
+
+    def fit(self, widths, available):
+        """Scale widths to fill the available page width"""
+        total = sum(widths)
+        if total <= 0:
+            return [available / len(widths)] * len(widths)
+        return [width * available / total for width in widths]
+
+    def render(self, pdf, rows, result, on_progress=None):
+        """Draw all rows onto pdf, starting on its current page"""
+        start = time.perf_counter()
+        rows = iter(rows)
+        sample = [self.format_row(row) for row in islice(rows, self.sample_size)]
+
+        available = pdf.w - pdf.l_margin - pdf.r_margin
+        self.widths = self.fit(self.measure(pdf, sample), available)
+        page_bottom = pdf.h - pdf.b_margin
+
+        # Page breaks are placed here so the header can be redrawn after each one
+        pdf.set_auto_page_break(False)
+        self.draw_header(pdf)
+        pages_before = pdf.page_no()
+
+        formatted = chain(sample, (self.format_row(row) for row in rows))
+        for row in formatted:
+            if pdf.get_y() + self.row_height > page_bottom:
+                pdf.add_page()
+                self.draw_header(pdf)
+                if on_progress:
+                    result.elapsed = time.perf_counter() - start
+                    result.pages = pdf.page_no() - pages_before
+                    on_progress(result.pages, result.pages_per_second)
+            self.draw_row(pdf, row)
+            result.rows_exported += 1
+
+        pdf.set_auto_page_break(True, pdf.b_margin)
+        result.pages = pdf.page_no() - pages_before + 1
+        return result
+
+    def draw_header(self, pdf):
+        pdf.set_font(self.font_family, 'B', self.font_size)
+        pdf.set_fill_color(230, 230, 230)
+        for name, width in zip(self.columns, self.widths):
+            pdf.cell(width, self.row_height, txt=self.clip(pdf, pdf_text(name), width),
+                     border=1, align='C', fill=True)
+        pdf.ln()
+        pdf.set_font(self.font_family, '', self.font_size)
+
+    def draw_row(self, pdf, row):
+        for i, (text, width) in enumerate(zip(row, self.widths)):
+            pdf.cell(width, self.row_height, txt=self.clip(pdf, text, width),
+                     border=1, align=self.aligns.get(i, 'L'))
+        pdf.ln()
+
+    def clip(self, pdf, text, width):
+        """Shorten text with "..." so it fits inside a cell of the given width"""
+        room = width - 2 * CELL_PADDING
+        if not text or pdf.get_string_width(text) <= room:
+            return text
+        while text and pdf.get_string_width(text + "...") > room:
+            # Drop roughly the overflowing share of characters at once
+            overflow = pdf.get_string_width(text + "...") - room
+            average = pdf.get_string_width(text) / len(text)
+            text = text[:-max(1, int(overflow / average))]
+        return text + "..."
+
+
+def write_pdf_report(file_path, title, columns, rows, formatters=None, aligns=None,
+                     summary_lines=(), orientation=None, on_progress=None, **table_options):
+    """Render a titled report table to a PDF file and return a PdfExportResult
+
+    orientation is 'P' or 'L'; by default landscape is used for tables with
+    more than six columns. summary_lines are printed after the table.
+    on_progress(pages, pages_per_second) is called as each page fills.
+    """
+    result = PdfExportResult(file_path)
+    start = time.perf_counter()
+
+    if orientation is None:
+        orientation = 'L' if len(columns) > 6 else 'P'
+    pdf = FPDF(orientation=orientation)
+    pdf.add_page()
+
+    pdf.set_font("Arial", 'B', 14)
+    pdf.cell(0, 10, txt=pdf_text(title), ln=1, align='C')
+    pdf.ln(4)
+
+    table = PdfTable(columns, formatters, aligns, **table_options)
+    table.render(pdf, rows, result, on_progress)
+
+    if summary_lines:
+        pdf.ln(5)
+        pdf.set_font("Arial", 'B', 12)
+        for line in summary_lines:
+            pdf.cell(0, 8, txt=pdf_text(line), ln=1)
+
+    pdf.output(file_path)
+    result.pages = pdf.page_no()
+    result.elapsed = time.perf_counter() - start
+    return result
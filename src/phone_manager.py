@@ -3,13 +3,123 @@ import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
-from tkcalendar import DateEntry
-from PIL import Image, ImageTk
-import qrcode
 import os
 from datetime import datetime
-from database import create_connection
+from connection_manager import get_connection
+from phone_search import search_phones, SEARCH_RESULT_LIMIT
+from background_search import DebouncedSearch
+from paged_list import KeysetPager, PagedTreeview
+from background_tasks import get_executor, BusyIndicator
+from qr_labels import qr_payload, select_label_phones, generate_label_sheet
+from qr_image_cache import QRImageCache
 import sqlite3
+from lazy_imports import lazy_import
+
+# Imaging libraries are only loaded when a QR code is first saved or printed
+qrcode = lazy_import("qrcode")
+Image = lazy_import("PIL.Image")
+
+QR_CODES_DIR = "data/qr_codes"
+
+
+# Database work for the phone screen; these run on the executor's worker
+# threads, so they take plain values and never touch widgets
+
+
+def fetch_phone(phone_id):
+    return get_connection().execute("SELECT * FROM phones WHERE id=?", (phone_id,)).fetchone()
+
+
+def save_phone_row(phone_id, phone_data):
+    """ Update phone_id, or insert a new phone when it is None; returns the id """
+    conn = get_connection()
+    try:
+        if phone_id:
+            conn.execute(
+                """
+            UPDATE phones 
+            SET brand=:brand, model=:model, imei=:imei, color=:color, storage=:storage, 
+                ram=:ram, condition=:condition, price=:price, cost_price=:cost_price, 
+                quantity=:quantity, description=:description, updated_at=CURRENT_TIMESTAMP
+            WHERE id=:id
+            """,
+                dict(phone_data, id=phone_id),
+            )
+        else:
+            cursor = conn.execute(
+                """
+            INSERT INTO phones 
+            (brand, model, imei, color, storage, ram, condition, price, cost_price, quantity, description)
+            VALUES (:brand, :model, :imei, :color, :storage, :ram, :condition, :price, :cost_price, :quantity, :description)
+            """,
+                phone_data,
+            )
+            phone_id = cursor.lastrowid
+        conn.commit()
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+    return phone_id
+
+
+def delete_phone_row(phone_id):
+    """ Delete a phone and its QR code file """
+    conn = get_connection()
+    try:
+        row = conn.execute("SELECT qr_code_path FROM phones WHERE id=?", (phone_id,)).fetchone()
+        conn.execute("DELETE FROM phones WHERE id=?", (phone_id,))
+        conn.commit()
+    except sqlite3.Error:
+        conn.rollback()
+        raise
+
+    qr_path = row[0] if row else None
+    if qr_path and os.path.exists(qr_path):
+        os.remove(qr_path)
+
+
+def write_qr_png(phone_id):
+    """ Save a phone's printable QR code and record its path
+
+    Returns (qr_path, (brand, model, imei)), or None if the phone is gone.
+    """
+    conn = get_connection()
+    phone = conn.execute(
+        "SELECT brand, model, imei FROM phones WHERE id=?", (phone_id,)
+    ).fetchone()
+    if not phone:
+        return None
+
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_L,
+        box_size=10,
+        border=4,
+    )
+    qr.add_data(qr_payload(phone_id, *phone))
+    qr.make(fit=True)
+    img = qr.make_image(fill_color="black", back_color="white")
+
+    os.makedirs(QR_CODES_DIR, exist_ok=True)
+    qr_path = os.path.join(QR_CODES_DIR, f"phone_{phone_id}.png")
+    img.save(qr_path)
+
+    conn.execute("UPDATE phones SET qr_code_path=? WHERE id=?", (qr_path, phone_id))
+    conn.commit()
+    return qr_path, phone
+
+
+def qr_png_path(phone_id):
+    """ Path of a phone's QR code PNG, writing it first if it is missing """
+    row = get_connection().execute(
+        "SELECT qr_code_path FROM phones WHERE id=?", (phone_id,)
+    ).fetchone()
+    qr_path = row[0] if row else None
+    if qr_path and os.path.exists(qr_path):
+        return qr_path
+    # Codes shown from the cache have no PNG until one is needed
+    written = write_qr_png(phone_id)
+    return written[0] if written else None
 
 
 class PhoneManager:
@@ -18,6 +128,12 @@ class PhoneManager:
         self.user_data = user_data
         self.current_phone_id = None
         self.qr_image = None
+        self.showing_results = False  # search results rather than the paged list
+        self.qr_images = QRImageCache()
+        self.select_task = None
+
+        # Database work runs on the shared workers, never on the Tk thread
+        self.executor = get_executor(self.parent)
 
         # Create main frames
         self.main_frame = ttk.Frame(self.parent)
@@ -120,6 +236,11 @@ class PhoneManager:
         self.search_entry.pack(side=tk.LEFT, padx=5)
         self.search_entry.bind("<KeyRelease>", self.search_phones)
 
+        # Searches run on a worker thread; only the latest result is shown
+        self.search = DebouncedSearch(
+            self.parent, search_phones, self.show_phones, self.on_search_error
+        )
+
         ttk.Button(
             search_frame,
             text="Search",
@@ -157,10 +278,20 @@ class PhoneManager:
         scrollbar = ttk.Scrollbar(
             tree_frame, orient=tk.VERTICAL, command=self.tree.yview
         )
-        self.tree.configure(yscroll=scrollbar.set)
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         self.tree.pack(fill=tk.BOTH, expand=True)
 
+        # Rows are fetched a page at a time as the list is scrolled
+        status_frame = ttk.Frame(self.right_frame)
+        status_frame.pack(fill=tk.X)
+        self.phone_count_var = tk.StringVar()
+        ttk.Label(status_frame, textvariable=self.phone_count_var).pack(side=tk.LEFT)
+        self.busy = BusyIndicator(status_frame, side=tk.RIGHT, padx=5)
+        self.phone_pages = PagedTreeview(
+            self.tree, scrollbar, on_count=self.update_phone_count,
+            executor=self.executor, busy=self.busy, error_title="Failed to load phones",
+        )
+
         # Bind selection
         self.tree.bind("<<TreeviewSelect>>", self.on_phone_select)
 
@@ -180,54 +311,59 @@ class PhoneManager:
         ttk.Button(
             action_frame, text="Refresh", command=self.load_phones, style="info.TButton"
         ).pack(side=tk.RIGHT, padx=5)
+        ttk.Button(
+            action_frame,
+            text="Print Labels",
+            command=self.print_labels,
+            style="secondary.TButton",
+        ).pack(side=tk.RIGHT, padx=5)
 
     def load_phones(self):
-        # Clear existing data
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-
-        try:
-            conn = create_connection("data/phone_store.db")
-            cursor = conn.cursor()
-            cursor.execute(
-                "SELECT id, brand, model, imei, price, quantity FROM phones ORDER BY brand, model"
-            )
-            phones = cursor.fetchall()
-            conn.close()
-
-            for phone in phones:
-                self.tree.insert("", tk.END, values=phone)
+        # Pages are read on worker threads, each with its own connection
+        pager = KeysetPager(
+            get_connection,
+            "id, brand, model, imei, price, quantity",
+            "phones",
+            ["brand", "model", "id"],
+        )
+        self.phone_pages.load(pager)
+        self.showing_results = False
 
-        except sqlite3.Error as e:
-            messagebox.showerror("Database Error", f"Failed to load phones: {str(e)}")
+    def update_phone_count(self, loaded, total):
+        self.phone_count_var.set(f"Showing {loaded} of {total} phones")
 
     def search_phones(self, event=None):
         search_term = self.search_entry.get()
 
-        # Clear existing data
-        for item in self.tree.get_children():
-            self.tree.delete(item)
+        if not search_term.strip():
+            # An empty box means the whole catalogue, which is paged, not searched
+            self.search.cancel()
+            if event is None or self.showing_results:
+                self.load_phones()
+            return
 
-        try:
-            conn = create_connection("data/phone_store.db")
-            cursor = conn.cursor()
-            query = """
-            SELECT id, brand, model, imei, price, quantity 
-            FROM phones 
-            WHERE brand LIKE ? OR model LIKE ? OR imei LIKE ?
-            ORDER BY brand, model
-            """
-            cursor.execute(
-                query, (f"%{search_term}%", f"%{search_term}%", f"%{search_term}%")
+        if event is None:
+            # Search button: run right away
+            self.search.search_now(search_term)
+        else:
+            # Typing: wait until the user pauses
+            self.search.submit(search_term)
+
+    def show_phones(self, phones):
+        # Search results replace the paged list
+        self.phone_pages.reset()
+        self.showing_results = True
+        for phone in phones:
+            self.tree.insert("", tk.END, values=phone)
+        if len(phones) >= SEARCH_RESULT_LIMIT:
+            self.phone_count_var.set(
+                f"Showing the best {len(phones)} matches, refine the search to see others"
             )
-            phones = cursor.fetchall()
-            conn.close()
+        else:
+            self.phone_count_var.set(f"{len(phones)} phones found")
 
-            for phone in phones:
-                self.tree.insert("", tk.END, values=phone)
-
-        except sqlite3.Error as e:
-            messagebox.showerror("Database Error", f"Failed to search phones: {str(e)}")
+    def on_search_error(self, error):
+        messagebox.showerror("Database Error", f"Failed to search phones: {str(error)}")
 
     def clear_form(self):
         self.current_phone_id = None
@@ -252,50 +388,50 @@ class PhoneManager:
 
         self.current_phone_id = phone_data[0]
 
-        try:
-            conn = create_connection("data/phone_store.db")
-            cursor = conn.cursor()
-            cursor.execute("SELECT * FROM phones WHERE id=?", (self.current_phone_id,))
-            phone = cursor.fetchone()
-            conn.close()
-
-            if phone:
-                # Map data to form fields
-                fields = [
-                    "brand",
-                    "model",
-                    "imei",
-                    "color",
-                    "storage",
-                    "ram",
-                    "condition",
-                    "price",
-                    "cost_price",
-                    "quantity",
-                    "description",
-                ]
-
-                for i, field in enumerate(fields):
-                    if field in self.entries:
-                        entry = self.entries[field]
-                        if isinstance(entry, tk.Text):
-                            entry.delete("1.0", tk.END)
-                            entry.insert("1.0", phone[i + 1] if phone[i + 1] else "")
-                        else:
-                            entry.delete(0, tk.END)
-                            entry.insert(0, phone[i + 1] if phone[i + 1] else "")
-
-                # Display QR code if exists
-                qr_path = phone[11]  # qr_code_path field
-                if qr_path and os.path.exists(qr_path):
-                    self.display_qr_code(qr_path)
+        # Arrowing through the list replaces a lookup that hasn't finished
+        if self.select_task:
+            self.select_task.cancel()
+        self.select_task = self.executor.submit(
+            fetch_phone,
+            self.current_phone_id,
+            on_success=self.show_phone,
+            on_error=lambda e: messagebox.showerror(
+                "Database Error", f"Failed to load phone details: {str(e)}"
+            ),
+            busy=self.busy,
+        )
+
+    def show_phone(self, phone):
+        if not phone or phone[0] != self.current_phone_id:
+            return
+
+        # Map data to form fields
+        fields = [
+            "brand",
+            "model",
+            "imei",
+            "color",
+            "storage",
+            "ram",
+            "condition",
+            "price",
+            "cost_price",
+            "quantity",
+            "description",
+        ]
+
+        for i, field in enumerate(fields):
+            if field in self.entries:
+                entry = self.entries[field]
+                if isinstance(entry, tk.Text):
+                    entry.delete("1.0", tk.END)
+                    entry.insert("1.0", phone[i + 1] if phone[i + 1] else "")
                 else:
-                    self.generate_qr_code()
+                    entry.delete(0, tk.END)
+                    entry.insert(0, phone[i + 1] if phone[i + 1] else "")
 
-        except sqlite3.Error as e:
-            messagebox.showerror(
-                "Database Error", f"Failed to load phone details: {str(e)}"
-            )
+        # Shown from memory; the PNG is only written when saved or printed
+        self.display_qr_code(phone[1], phone[2], phone[3])
 
     def save_phone(self):
         # Validate required fields
@@ -304,9 +440,6 @@ class PhoneManager:
             return
 
         try:
-            conn = create_connection("data/phone_store.db")
-            cursor = conn.cursor()
-
             # Prepare data
             phone_data = {
                 "brand": self.entries["brand"].get(),
@@ -321,49 +454,37 @@ class PhoneManager:
                 "quantity": int(self.entries["quantity"].get() or 1),
                 "description": self.entries["description"].get("1.0", tk.END).strip(),
             }
-
-            if self.current_phone_id:
-                # Update existing phone
-                phone_data["id"] = self.current_phone_id
-                cursor.execute(
-                    """
-                UPDATE phones 
-                SET brand=:brand, model=:model, imei=:imei, color=:color, storage=:storage, 
-                    ram=:ram, condition=:condition, price=:price, cost_price=:cost_price, 
-                    quantity=:quantity, description=:description, updated_at=CURRENT_TIMESTAMP
-                WHERE id=:id
-                """,
-                    phone_data,
-                )
-                messagebox.showinfo("Success", "Phone updated successfully")
-            else:
-                # Insert new phone
-                cursor.execute(
-                    """
-                INSERT INTO phones 
-                (brand, model, imei, color, storage, ram, condition, price, cost_price, quantity, description)
-                VALUES (:brand, :model, :imei, :color, :storage, :ram, :condition, :price, :cost_price, :quantity, :description)
-                """,
-                    phone_data,
-                )
-                self.current_phone_id = cursor.lastrowid
-                messagebox.showinfo("Success", "Phone added successfully")
-
-                # Generate QR code for new phone
-                self.generate_qr_code()
-
-            conn.commit()
-            conn.close()
-
-            # Refresh phone list
-            self.load_phones()
-
         except ValueError:
             messagebox.showerror(
                 "Error", "Please enter valid numbers for price and quantity"
             )
-        except sqlite3.Error as e:
-            messagebox.showerror("Database Error", f"Failed to save phone: {str(e)}")
+            return
+
+        added = not self.current_phone_id
+        self.executor.submit(
+            save_phone_row,
+            self.current_phone_id,
+            phone_data,
+            on_success=lambda phone_id: self.phone_saved(phone_id, added),
+            on_error=lambda e: messagebox.showerror(
+                "Database Error", f"Failed to save phone: {str(e)}"
+            ),
+            busy=self.busy,
+        )
+
+    def phone_saved(self, phone_id, added):
+        if added:
+            self.current_phone_id = phone_id
+            messagebox.showinfo("Success", "Phone added successfully")
+        else:
+            messagebox.showinfo("Success", "Phone updated successfully")
+            # Brand, model or IMEI may have changed, so redo the QR code
+            self.qr_images.evict(phone_id)
+
+        self.generate_qr_code(phone_id)
+
+        # Refresh phone list
+        self.load_phones()
 
     def edit_phone(self):
         selected_item = self.tree.focus()
@@ -385,99 +506,52 @@ class PhoneManager:
         if messagebox.askyesno(
             "Confirm", "Are you sure you want to delete this phone?"
         ):
-            try:
-                conn = create_connection("data/phone_store.db")
-                cursor = conn.cursor()
-
-                # Get QR code path to delete the file
-                cursor.execute(
-                    "SELECT qr_code_path FROM phones WHERE id=?",
-                    (self.current_phone_id,),
-                )
-                qr_path = cursor.fetchone()[0]
-
-                # Delete phone from database
-                cursor.execute(
-                    "DELETE FROM phones WHERE id=?", (self.current_phone_id,)
-                )
-                conn.commit()
-                conn.close()
-
-                # Delete QR code file if exists
-                if qr_path and os.path.exists(qr_path):
-                    os.remove(qr_path)
-
-                messagebox.showinfo("Success", "Phone deleted successfully")
-                self.clear_form()
-                self.load_phones()
-
-            except sqlite3.Error as e:
-                messagebox.showerror(
+            phone_id = self.current_phone_id
+            self.executor.submit(
+                delete_phone_row,
+                phone_id,
+                on_success=lambda _: self.phone_deleted(phone_id),
+                on_error=lambda e: messagebox.showerror(
                     "Database Error", f"Failed to delete phone: {str(e)}"
-                )
-
-    def generate_qr_code(self):
-        if not self.current_phone_id:
-            messagebox.showwarning("Warning", "Please save phone details first")
-            return
-
-        try:
-            conn = create_connection("data/phone_store.db")
-            cursor = conn.cursor()
-            cursor.execute(
-                "SELECT brand, model, imei FROM phones WHERE id=?", (self.current_phone_id,)
+                ),
+                busy=self.busy,
             )
-            phone = cursor.fetchone()
-            conn.close()
-
-            if phone:
-                # Create QR code data - simplified version
-                qr_data = f"PHONE:{self.current_phone_id}|{phone[0]}|{phone[1]}|{phone[2]}"
-
-                # Generate QR code
-                qr = qrcode.QRCode(
-                    version=1,
-                    error_correction=qrcode.constants.ERROR_CORRECT_L,
-                    box_size=10,
-                    border=4,
-                )
-                qr.add_data(qr_data)
-                qr.make(fit=True)
-
-                img = qr.make_image(fill_color="black", back_color="white")
 
-                # Save QR code image
-                qr_dir = "data/qr_codes"
-                if not os.path.exists(qr_dir):
-                    os.makedirs(qr_dir)
-
-                qr_path = os.path.join(qr_dir, f"phone_{self.current_phone_id}.png")
-                img.save(qr_path)
+    def phone_deleted(self, phone_id):
+        self.qr_images.evict(phone_id)
+        messagebox.showinfo("Success", "Phone deleted successfully")
+        if phone_id == self.current_phone_id:
+            self.clear_form()
+        self.load_phones()
 
-                # Update database with QR code path
-                conn = create_connection("data/phone_store.db")
-                cursor = conn.cursor()
-                cursor.execute(
-                    "UPDATE phones SET qr_code_path=? WHERE id=?",
-                    (qr_path, self.current_phone_id),
-                )
-                conn.commit()
-                conn.close()
+    def generate_qr_code(self, phone_id=None):
+        phone_id = phone_id or self.current_phone_id
+        if not phone_id:
+            messagebox.showwarning("Warning", "Please save phone details first")
+            return
 
-                # Display QR code
-                self.display_qr_code(qr_path)
+        self.executor.submit(
+            write_qr_png,
+            phone_id,
+            on_success=lambda written: self.qr_code_written(phone_id, written),
+            on_error=lambda e: messagebox.showerror(
+                "Error", f"Failed to generate QR code: {str(e)}"
+            ),
+            busy=self.busy,
+        )
 
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to generate QR code: {str(e)}")
+    def qr_code_written(self, phone_id, written):
+        # The user may have moved on to another phone meanwhile
+        if written and phone_id == self.current_phone_id:
+            self.display_qr_code(*written[1])
 
-    def display_qr_code(self, qr_path):
+    def display_qr_code(self, brand, model, imei):
         try:
-            # Open and resize the image
-            img = Image.open(qr_path)
-            img = img.resize((200, 200), Image.LANCZOS)
-
-            # Convert to PhotoImage
-            self.qr_image = ImageTk.PhotoImage(img)
+            # Drawn at display size once, then reused while browsing the list
+            self.qr_image = self.qr_images.get(
+                self.current_phone_id,
+                qr_payload(self.current_phone_id, brand, model, imei),
+            )
 
             # Update the label
             self.qr_label.config(image=self.qr_image)
@@ -492,35 +566,69 @@ class PhoneManager:
             messagebox.showwarning("Warning", "No QR code to print")
             return
 
+        phone_id = self.current_phone_id
+        self.executor.submit(
+            qr_png_path,
+            phone_id,
+            on_success=lambda qr_path: self.save_printable_qr(phone_id, qr_path),
+            on_error=lambda e: messagebox.showerror(
+                "Error", f"Failed to print QR code: {str(e)}"
+            ),
+            busy=self.busy,
+        )
+
+    def save_printable_qr(self, phone_id, qr_path):
+        if not qr_path:
+            messagebox.showerror("Error", "QR code file not found")
+            return
+
         try:
-            # Get the QR code path from the database
-            conn = create_connection("data/phone_store.db")
-            cursor = conn.cursor()
-            cursor.execute(
-                "SELECT qr_code_path FROM phones WHERE id=?", (self.current_phone_id,)
+            # Open the image
+            img = Image.open(qr_path)
+
+            # Ask user where to save the printable version
+            file_path = filedialog.asksaveasfilename(
+                defaultextension=".png",
+                filetypes=[("PNG files", "*.png"), ("All files", "*.*")],
+                initialfile=f"phone_qr_{phone_id}.png",
             )
-            qr_path = cursor.fetchone()[0]
-            conn.close()
-
-            if qr_path and os.path.exists(qr_path):
-                # Open the image
-                img = Image.open(qr_path)
-
-                # Ask user where to save the printable version
-                file_path = filedialog.asksaveasfilename(
-                    defaultextension=".png",
-                    filetypes=[("PNG files", "*.png"), ("All files", "*.*")],
-                    initialfile=f"phone_qr_{self.current_phone_id}.png",
-                )
 
-                if file_path:
-                    img.save(file_path)
-                    messagebox.showinfo(
-                        "Success",
-                        f"QR code saved to:\n{file_path}\nYou can print this file.",
-                    )
-            else:
-                messagebox.showerror("Error", "QR code file not found")
+            if file_path:
+                img.save(file_path)
+                messagebox.showinfo(
+                    "Success",
+                    f"QR code saved to:\n{file_path}\nYou can print this file.",
+                )
 
         except Exception as e:
             messagebox.showerror("Error", f"Failed to print QR code: {str(e)}")
+
+    def print_labels(self):
+        # Label the phones found by the current search, or everything in stock
+        ids = None
+        if self.search_entry.get().strip():
+            ids = [int(self.tree.item(item, "values")[0]) for item in self.tree.get_children()]
+            if not ids:
+                messagebox.showwarning("Warning", "No phones to label")
+                return
+
+        file_path = filedialog.asksaveasfilename(
+            defaultextension=".pdf",
+            filetypes=[("PDF Files", "*.pdf")],
+            initialfile="phone_labels.pdf",
+        )
+        if not file_path:
+            return
+
+        def make_labels():
+            phones = select_label_phones(ids=ids, in_stock=ids is None)
+            return generate_label_sheet(file_path, phones)
+
+        self.executor.submit(
+            make_labels,
+            on_success=lambda result: messagebox.showinfo(
+                "Success", f"{result.rows_exported} labels saved to {file_path}"
+            ),
+            on_error=lambda e: messagebox.showerror("Error", f"Failed to create labels: {str(e)}"),
+            busy=self.busy,
+        )
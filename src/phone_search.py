@@ -0,0 +1,89 @@
+# phone_search.py - Phone catalogue search backed by the FTS5 index
+import re
+import sqlite3
+
+PHONE_LIST_COLUMNS = "p.id, p.brand, p.model, p.imei, p.price, p.quantity"
+
+# Most rows a search returns; the full list is paged instead (paged_list.py)
+SEARCH_RESULT_LIMIT = 500
+
+# Cache of whether each connection has the phones_fts table. Keyed by the
+# connection itself so a new one can't reuse an old id() (as report_cache)
+_fts_tables = {}
+
+
+def has_fts_index(conn):
+    """ Check (once per connection) whether the phones_fts index exists """
+    if conn not in _fts_tables:
+        cursor = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name='phones_fts'"
+        )
+        _fts_tables[conn] = cursor.fetchone() is not None
+    return _fts_tables[conn]
+
+
+def is_interrupt(error):
+    """ Whether an OperationalError is a query cancelled by conn.interrupt() """
+    # sqlite_errorcode is Python 3.11+; older versions only have the message
+    code = getattr(error, "sqlite_errorcode", None)
+    if code is not None:
+        return code == sqlite3.SQLITE_INTERRUPT
+    return str(error) == "interrupted"
+
+
+def build_match_query(search_term):
+    """ Turn free text into an FTS5 query where every word is a prefix match
+
+    "sams gal 12" becomes '"sams"* "gal"* "12"*', i.e. all words must match
+    the start of a token in any indexed column.
+    """
+    words = re.findall(r"\w+", search_term)
+    return " ".join(f'"{word}"*' for word in words)
+
+
+def search_phones(conn, search_term, limit=SEARCH_RESULT_LIMIT):
+    """ Return (id, brand, model, imei, price, quantity) rows matching the term
+
+    Uses the FTS5 index with prefix matching and ranks the best matches
+    first. Falls back to LIKE queries when FTS5 isn't available. At most
+    limit rows are returned, so a broad term can't load the catalogue.
+    """
+    search_term = search_term.strip()
+    cursor = conn.cursor()
+
+    if not search_term:
+        cursor.execute(f"""
+        SELECT {PHONE_LIST_COLUMNS} FROM phones p ORDER BY p.brand, p.model LIMIT ?
+        """, (limit,))
+        return cursor.fetchall()
+
+    if has_fts_index(conn):
+        match_query = build_match_query(search_term)
+        if not match_query:
+            return []
+        try:
+            cursor.execute(f"""
+            SELECT {PHONE_LIST_COLUMNS}
+            FROM phones_fts
+            JOIN phones p ON p.id = phones_fts.rowid
+            WHERE phones_fts MATCH ?
+            ORDER BY phones_fts.rank, p.brand, p.model
+            LIMIT ?
+            """, (match_query, limit))
+            return cursor.fetchall()
+        except sqlite3.OperationalError as e:
+            # A cancelled search is stale; rerunning it as a LIKE scan would
+            # undo the interrupt
+            if is_interrupt(e):
+                raise
+            print(f"FTS search failed, falling back to LIKE: {e}")
+
+    pattern = f"%{search_term}%"
+    cursor.execute(f"""
+    SELECT {PHONE_LIST_COLUMNS}
+    FROM phones p
+    WHERE p.brand LIKE ? OR p.model LIKE ? OR p.imei LIKE ?
+    ORDER BY p.brand, p.model
+    LIMIT ?
+    """, (pattern, pattern, pattern, limit))
+    return cursor.fetchall()
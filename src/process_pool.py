@@ -0,0 +1,21 @@
+# process_pool.py - Worker processes for CPU-bound batch jobs
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+
+def spawn_pool(max_workers, initializer=None, initargs=()):
+    """Return a ProcessPoolExecutor whose workers are started with spawn
+
+    fork would copy this process into every worker. That copy includes open
+    SQLite connections, which must not be used across a fork, and the Tk
+    interpreter. Spawned workers start from a fresh interpreter, so they
+    open their own connections. Tasks and initializers must be module-level
+    functions with picklable arguments, and the entry point must call
+    multiprocessing.freeze_support().
+    """
+    return ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=initializer,
+        initargs=initargs,
+    )
@@ -1,13 +1,18 @@
 # qr_code.py
-import cv2
-from pyzbar.pyzbar import decode
-from PIL import Image, ImageTk
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
 import ttkbootstrap as ttk
-from database import create_connection
+from connection_manager import get_connection
+from lazy_imports import lazy_import
 import sqlite3
 
+# Camera and barcode libraries are loaded when scanning starts
+cv2 = lazy_import('cv2')
+np = lazy_import('numpy')
+decode = lazy_import('pyzbar.pyzbar', 'decode')
+Image = lazy_import('PIL.Image')
+ImageTk = lazy_import('PIL.ImageTk')
+
 class QRScanner:
     def __init__(self, parent):
         self.parent = parent
@@ -150,7 +155,7 @@ class QRScanner:
     
     def lookup_phone_details(self, phone_id):
         try:
-            conn = create_connection('data/phone_store.db')
+            conn = get_connection()
             cursor = conn.cursor()
             cursor.execute("""
             SELECT p.id, p.brand, p.model, p.imei, p.color, p.storage, p.ram, 
@@ -159,7 +164,6 @@ class QRScanner:
             WHERE p.id = ?
             """, (phone_id,))
             phone = cursor.fetchone()
-            conn.close()
             
             if phone:
                 details = (
@@ -0,0 +1,75 @@
+# qr_image_cache.py - Ready-to-show QR code images for the phone screen
+import hashlib
+import tkinter as tk
+from collections import OrderedDict
+from qr_labels import qr_runs
+
+QR_DISPLAY_SIZE = 200   # pixels, width and height of the shown code
+QR_BORDER = 4           # modules of white space around the shown code
+MAX_CACHED_QR_IMAGES = 64
+
+
+def payload_hash(payload):
+    """ Short, stable digest of a QR payload, used in cache keys """
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def render_qr_image(payload, size=QR_DISPLAY_SIZE):
+    """ A size x size Tk PhotoImage of payload's QR code, drawn at that size
+
+    Each module is a whole number of pixels and the spare pixels become
+    white margin, so nothing is resampled: dark runs are filled straight
+    into the image, one rectangle per run.
+    """
+    modules, runs = qr_runs(payload)
+    pixel = max(size // (modules + 2 * QR_BORDER), 1)
+    offset = (size - modules * pixel) // 2
+    image = tk.PhotoImage(width=size, height=size)
+    image.put("#ffffff", to=(0, 0, size, size))
+    for row, column, length in runs:
+        x = offset + column * pixel
+        y = offset + row * pixel
+        image.put("#000000", to=(x, y, x + length * pixel, y + pixel))
+    return image
+
+
+class QRImageCache:
+    """ LRU of PhotoImages keyed by (phone id, payload hash)
+
+    The payload is part of the key so a phone changed elsewhere never shows
+    its old code; evict(phone_id) drops a phone's images after an edit or
+    delete. Tk images aren't thread safe, so this is used from the UI
+    thread only.
+    """
+
+    def __init__(self, max_entries=MAX_CACHED_QR_IMAGES, size=QR_DISPLAY_SIZE):
+        self.max_entries = max_entries
+        self.size = size
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, phone_id, payload):
+        """ Return the PhotoImage for phone_id's payload, rendering it on a miss """
+        key = (phone_id, payload_hash(payload))
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+        self.misses += 1
+
+        # Any older image of this phone is for a payload it no longer has
+        self.evict(phone_id)
+        image = render_qr_image(payload, self.size)
+        self._entries[key] = image
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return image
+
+    def evict(self, phone_id):
+        """ Forget every cached image of phone_id """
+        for key in [key for key in self._entries if key[0] == phone_id]:
+            del self._entries[key]
+
+    def clear(self):
+        self._entries.clear()
@@ -0,0 +1,198 @@
+# qr_labels.py - Printable QR label sheets for many phones at once
+import os
+import time
+from connection_manager import get_connection
+from lazy_imports import lazy_import
+from pdf_table import PdfExportResult, TextMeasurer, money, pdf_text
+from process_pool import spawn_pool
+
+qrcode = lazy_import('qrcode')
+FPDF = lazy_import('fpdf', 'FPDF')
+
+# Sheet layouts, all sizes in mm. 'a4' is a 3 x 8 sheet of 70 x 37 labels;
+# 'roll' is one 62 x 29 label per page for a label printer.
+LABEL_LAYOUTS = {
+    "a4": {"page": (210, 297), "columns": 3, "rows": 8, "label": (70, 37),
+           "margin": (0, 0.5), "padding": 2.5},
+    "roll": {"page": (62, 29), "columns": 1, "rows": 1, "label": (62, 29),
+             "margin": (0, 0), "padding": 2},
+}
+
+QUIET_ZONE = 2        # modules of white space around each QR code
+IN_PROCESS_LIMIT = 40 # fewer codes than this aren't worth starting workers for
+
+
+def qr_payload(phone_id, brand, model, imei):
+    """ Text encoded in a phone's QR code, the same as the phone screen's """
+    return f"PHONE:{phone_id}|{brand}|{model}|{imei}"
+
+
+def qr_runs(payload):
+    """ A QR code as (size, runs): runs are (row, column, length) dark stretches
+
+    Rows are stored as runs so a label draws one rectangle per stretch of
+    dark modules instead of one per module. Runs in a worker process.
+    """
+    qr = qrcode.QRCode(error_correction=qrcode.constants.ERROR_CORRECT_M, border=0)
+    qr.add_data(payload)
+    qr.make(fit=True)
+    matrix = qr.get_matrix()
+    runs = []
+    for y, row in enumerate(matrix):
+        start = None
+        for x, dark in enumerate(row):
+            if dark and start is None:
+                start = x
+            elif not dark and start is not None:
+                runs.append((y, start, x - start))
+                start = None
+        if start is not None:
+            runs.append((y, start, len(row) - start))
+    return len(matrix), runs
+
+
+def iter_qr_runs(payloads, workers=None, chunksize=16):
+    """ qr_runs for each payload, in order, computed across worker processes """
+    payloads = list(payloads)
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(payloads) < IN_PROCESS_LIMIT:
+        yield from map(qr_runs, payloads)
+        return
+    with spawn_pool(workers) as pool:
+        yield from pool.map(qr_runs, payloads, chunksize=chunksize)
+
+
+def select_label_phones(brand=None, arrived_from=None, arrived_to=None, ids=None,
+                        in_stock=False, conn=None):
+    """ (id, brand, model, imei, price, quantity) rows of the phones to label
+
+    Filters combine: a brand, an arrival (created_at) date range that
+    includes both days, a list of ids, and only phones with stock left.
+    """
+    conn = conn or get_connection()
+    conditions, params = [], []
+    if brand:
+        conditions.append("brand = ?")
+        params.append(brand)
+    if arrived_from:
+        conditions.append("created_at >= ?")
+        params.append(str(arrived_from))
+    if arrived_to:
+        conditions.append("created_at < date(?, '+1 day')")
+        params.append(str(arrived_to))
+    if ids is not None:
+        if not ids:
+            return []
+        conditions.append(f"id IN ({', '.join('?' * len(ids))})")
+        params.extend(ids)
+    if in_stock:
+        conditions.append("quantity > 0")
+
+    sql = "SELECT id, brand, model, imei, price, quantity FROM phones"
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    sql += " ORDER BY brand, model, id"
+    return conn.execute(sql, params).fetchall()
+
+
+class LabelSheet:
+    """ Lays labels out in reading order across as many pages as needed """
+
+    def __init__(self, layout="a4"):
+        if layout not in LABEL_LAYOUTS:
+            raise ValueError(f"Unknown label layout {layout!r}; choose from {', '.join(LABEL_LAYOUTS)}")
+        self.layout = LABEL_LAYOUTS[layout]
+        page_w, page_h = self.layout["page"]
+        # FPDF takes the portrait size and swaps it for landscape
+        self.pdf = FPDF(orientation='L' if page_w > page_h else 'P', unit='mm',
+                        format=(min(page_w, page_h), max(page_w, page_h)))
+        self.pdf.set_auto_page_break(False)
+        self.pdf.set_margins(0, 0, 0)
+        self.measurer = TextMeasurer()
+        self.slot = 0
+        self.per_page = self.layout["columns"] * self.layout["rows"]
+
+    def add(self, phone, qr):
+        """ Draw one label for phone (id, brand, model, imei, price, ...) with its QR runs """
+        if self.slot % self.per_page == 0:
+            self.pdf.add_page()
+        index = self.slot % self.per_page
+        column, row = index % self.layout["columns"], index // self.layout["columns"]
+        label_w, label_h = self.layout["label"]
+        margin_x, margin_y = self.layout["margin"]
+        x = margin_x + column * label_w
+        y = margin_y + row * label_h
+        self.draw_label(x, y, label_w, label_h, phone, qr)
+        self.slot += 1
+
+    def draw_label(self, x, y, width, height, phone, qr):
+        pdf = self.pdf
+        padding = self.layout["padding"]
+        phone_id, brand, model, imei, price = phone[:5]
+
+        # QR code, square, on the left
+        size, runs = qr
+        side = height - 2 * padding
+        module = side / (size + 2 * QUIET_ZONE)
+        left = x + padding + QUIET_ZONE * module
+        top = y + padding + QUIET_ZONE * module
+        pdf.set_fill_color(0, 0, 0)
+        for row, column, length in runs:
+            pdf.rect(left + column * module, top + row * module, length * module, module, 'F')
+
+        # Text to the right of the code
+        text_x = x + padding + side + padding
+        text_w = x + width - padding - text_x
+        lines = [
+            ('B', 9, f"{brand} {model}"),
+            ('', 7, f"IMEI: {imei or '-'}"),
+            ('', 7, f"ID: {phone_id}"),
+            ('B', 12, money(price or 0)),
+        ]
+        line_y = y + padding + 3
+        for style, size_pt, text in lines:
+            pdf.set_font("Arial", style, size_pt)
+            pdf.text(text_x, line_y, self.fit(pdf_text(text), text_w))
+            line_y += size_pt * 0.45 + 1.5
+
+    def fit(self, text, width):
+        """ Shorten text with "..." to fit width at the current font """
+        if self.measurer.width(self.pdf, text) <= width:
+            return text
+        while text and self.measurer.width(self.pdf, text + "...") > width:
+            text = text[:-1]
+        return text + "..."
+
+
+def generate_label_sheet(file_path, phones, layout="a4", per_unit=False, workers=None,
+                         on_progress=None):
+    """ Render QR labels for phones onto printable sheets in one pass
+
+    phones are rows from select_label_phones. With per_unit, a phone gets
+    as many labels as it has units in stock (its QR code is made once).
+    QR codes are computed in worker processes and drawn as they arrive.
+    on_progress(labels_done, total_labels) is called after each phone.
+    Returns a PdfExportResult counting labels as rows.
+    """
+    result = PdfExportResult(file_path)
+    start = time.perf_counter()
+    phones = list(phones)
+    copies = [max(int(phone[5] or 0), 0) if per_unit else 1 for phone in phones]
+    total = sum(copies)
+
+    sheet = LabelSheet(layout)
+    payloads = (qr_payload(*phone[:4]) for phone in phones)
+    for phone, count, qr in zip(phones, copies, iter_qr_runs(payloads, workers)):
+        for _ in range(count):
+            sheet.add(phone, qr)
+        result.rows_exported += count
+        if on_progress:
+            on_progress(result.rows_exported, total)
+
+    if result.rows_exported == 0:
+        raise ValueError("No labels to print")
+    os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+    sheet.pdf.output(file_path)
+    result.pages = sheet.pdf.page_no()
+    result.elapsed = time.perf_counter() - start
+    return result
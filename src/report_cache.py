@@ -0,0 +1,72 @@
+# report_cache.py - LRU cache of report results that never outlives a write
+import threading
+from collections import OrderedDict
+from connection_manager import get_connection, data_signature
+
+MAX_CACHED_REPORTS = 64
+
+
+class ReportCache:
+    """Report results keyed by their parameters, dropped when the data changes
+
+    Keys are tuples such as ('sales', 20240101, 20241231, 'Month'). Before
+    every lookup the calling thread's connection is asked whether the
+    database changed since that connection last looked (data_signature);
+    if it did, or the connection is new to the cache, every entry is
+    dropped. A result computed while the cache was being cleared is not
+    stored, so a stale result can't be put back.
+    """
+
+    def __init__(self, max_entries=MAX_CACHED_REPORTS):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._signatures = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+
+    def check_for_changes(self, conn):
+        """Drop every entry if the database changed since conn last looked"""
+        signature = data_signature(conn)
+        with self._lock:
+            # Keyed by the connection itself so a new one can't reuse an old id()
+            if self._signatures.get(conn) != signature:
+                self._signatures[conn] = signature
+                self._entries.clear()
+                self._generation += 1
+
+    def get_or_compute(self, key, compute, conn=None):
+        """Return the cached result for key, or compute() and cache it"""
+        self.check_for_changes(conn or get_connection())
+
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            generation = self._generation
+
+        value = compute()
+
+        with self._lock:
+            if generation == self._generation:
+                self._entries[key] = value
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return value
+
+
+_report_cache = ReportCache()
+
+
+def get_report_cache():
+    """Return the application-wide report cache"""
+    return _report_cache
@@ -0,0 +1,318 @@
+# report_cli.py - Generate sales and stock reports without the GUI
+"""Produce the same reports as the Reports screen from the command line
+
+    python report_cli.py sales --from 2024-05-01 --to 2024-05-31 --group-by Month --format pdf xlsx
+    python report_cli.py stock --filter low --format csv
+    python report_cli.py pack month-end --month 2024-05 --workers 4
+    python report_cli.py batch jobs.json --workers 4
+    python report_cli.py invoices --from 2024-05-01 --to 2024-05-31 --merge may_invoices.pdf
+    python report_cli.py labels --brand Apple --arrived-from 2024-05-01 --layout roll --per-unit
+
+A batch file is a JSON list of jobs such as
+{"report": "sales", "from": "2024-05-01", "to": "2024-05-31",
+ "group_by": "Product", "formats": ["pdf", "csv"]} or
+{"report": "stock", "filter": "By Brand", "brand": "Apple", "formats": ["xlsx"]}.
+
+Jobs run in separate worker processes, each with its own read-only
+connection, so a pack can be scheduled while the shop is using the app.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import re
+import sys
+import time
+from concurrent.futures import as_completed
+from datetime import date, timedelta
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import connection_manager
+from date_keys import day_key
+from invoice import INVOICES_DIR, generate_invoices
+from process_pool import spawn_pool
+from qr_labels import LABEL_LAYOUTS, select_label_phones, generate_label_sheet
+from report_queries import (
+    SALES_GROUPINGS, ANALYTICS_REPORTS, STOCK_FILTERS, stock_report_title,
+    export_sales_report_pdf, export_sales_report_xlsx, export_sales_report_csv,
+    export_stock_report_pdf, export_stock_report_xlsx, export_stock_report_csv,
+)
+
+FORMATS = ("pdf", "xlsx", "csv")
+
+EXPORTERS = {
+    ("sales", "pdf"): export_sales_report_pdf,
+    ("sales", "xlsx"): export_sales_report_xlsx,
+    ("sales", "csv"): export_sales_report_csv,
+    ("stock", "pdf"): export_stock_report_pdf,
+    ("stock", "xlsx"): export_stock_report_xlsx,
+    ("stock", "csv"): export_stock_report_csv,
+}
+
+# Short names accepted for the stock filters on the command line
+STOCK_FILTER_ALIASES = {"all": 'All', "low": 'Low Stock (<5)', "brand": 'By Brand'}
+
+
+def slug(text):
+    """File-name friendly form of a grouping, filter or brand"""
+    return re.sub(r"[^a-z0-9]+", "_", str(text).lower()).strip("_")
+
+
+def sales_job(date_from, date_to, group_by, fmt, output_dir):
+    date_from, date_to = str(date_from), str(date_to)
+    file_name = f"sales_{date_from}_{date_to}_{slug(group_by)}.{fmt}"
+    return {"report": "sales", "format": fmt, "date_from": date_from, "date_to": date_to,
+            "group_by": group_by, "output": os.path.join(output_dir, file_name)}
+
+
+def stock_job(filter_type, brand, fmt, output_dir):
+    name = slug(filter_type) + (f"_{slug(brand)}" if filter_type == 'By Brand' else "")
+    return {"report": "stock", "format": fmt, "filter": filter_type, "brand": brand,
+            "output": os.path.join(output_dir, f"stock_{name}.{fmt}")}
+
+
+def validate_job(job):
+    """Raise ValueError if a job can't be run, before any worker starts"""
+    if (job.get("report"), job.get("format")) not in EXPORTERS:
+        raise ValueError(f"Unknown report or format: {job.get('report')!r}, {job.get('format')!r}")
+    if job["report"] == "sales":
+        if job["group_by"] not in SALES_GROUPINGS and job["group_by"] not in ANALYTICS_REPORTS:
+            raise ValueError(f"Unknown sales report grouping: {job['group_by']}")
+        if date.fromisoformat(job["date_from"]) > date.fromisoformat(job["date_to"]):
+            raise ValueError(f"Start date is after end date: {job['date_from']} > {job['date_to']}")
+    else:
+        if job["filter"] not in STOCK_FILTERS:
+            raise ValueError(f"Unknown stock filter: {job['filter']}")
+        if job["filter"] == 'By Brand' and not job.get("brand"):
+            raise ValueError("A brand is needed for the 'By Brand' stock report")
+
+
+def load_batch(path, output_dir):
+    """Expand a JSON batch file into one job per report and format"""
+    with open(path, encoding="utf-8") as f:
+        entries = json.load(f)
+
+    jobs = []
+    for entry in entries:
+        formats = entry.get("formats") or [entry.get("format", "pdf")]
+        for fmt in formats:
+            if entry.get("report") == "sales":
+                jobs.append(sales_job(entry["from"], entry["to"], entry.get("group_by", 'Day'),
+                                      fmt, output_dir))
+            elif entry.get("report") == "stock":
+                filter_type = STOCK_FILTER_ALIASES.get(entry.get("filter", "all"), entry.get("filter"))
+                jobs.append(stock_job(filter_type, entry.get("brand"), fmt, output_dir))
+            else:
+                raise ValueError(f"Unknown report in {path}: {entry.get('report')!r}")
+    return jobs
+
+
+def nightly_pack(day, formats, output_dir):
+    """Yesterday's sales by product and payment method, plus the stock lists"""
+    jobs = []
+    for fmt in formats:
+        for group_by in ('Product', 'Payment Method'):
+            jobs.append(sales_job(day, day, group_by, fmt, output_dir))
+        for filter_type in ('All', 'Low Stock (<5)'):
+            jobs.append(stock_job(filter_type, None, fmt, output_dir))
+    return jobs
+
+
+def month_end_pack(month, formats, output_dir):
+    """A month's sales by day, product, payment method and seller, plus stock"""
+    first = date.fromisoformat(f"{month}-01")
+    last = (first.replace(day=28) + timedelta(days=4)).replace(day=1) - timedelta(days=1)
+    jobs = []
+    for fmt in formats:
+        for group_by in ('Day', 'Product', 'Payment Method', 'Seller by Month', 'Product Margin'):
+            jobs.append(sales_job(first, last, group_by, fmt, output_dir))
+        jobs.append(stock_job('All', None, fmt, output_dir))
+    return jobs
+
+
+PACKS = {"nightly": nightly_pack, "month-end": month_end_pack}
+
+
+def init_worker(db_path):
+    """Point a worker process at the database, read-only"""
+    connection_manager.set_database_path(db_path, read_only=True)
+
+
+def run_job(job):
+    """Produce one report file; runs inside a worker process"""
+    export = EXPORTERS[job["report"], job["format"]]
+    if job["report"] == "sales":
+        result = export(job["output"], job["date_from"], job["date_to"], job["group_by"])
+    else:
+        result = export(job["output"], job["filter"], job["brand"],
+                        stock_report_title(job["filter"], job["brand"]))
+    return str(result)
+
+
+def run_jobs(jobs, db_path, workers=None, on_done=None):
+    """Run jobs across worker processes and return (succeeded, failed) lists
+
+    Each worker opens its own read-only connection to db_path. A job that
+    fails is reported in failed with its error and doesn't stop the others.
+    on_done(job, summary, error) is called as each job finishes.
+    """
+    for job in jobs:
+        validate_job(job)
+        os.makedirs(os.path.dirname(job["output"]) or ".", exist_ok=True)
+
+    db_path = os.path.abspath(db_path)
+    workers = max(1, min(workers or os.cpu_count() or 1, len(jobs)))
+    succeeded, failed = [], []
+
+    with spawn_pool(workers, init_worker, (db_path,)) as pool:
+        futures = {pool.submit(run_job, job): job for job in jobs}
+        for future in as_completed(futures):
+            job = futures[future]
+            try:
+                summary = future.result()
+            except Exception as e:
+                failed.append((job, e))
+                if on_done:
+                    on_done(job, None, e)
+            else:
+                succeeded.append((job, summary))
+                if on_done:
+                    on_done(job, summary, None)
+    return succeeded, failed
+
+
+def invoice_sale_ids(date_from=None, date_to=None):
+    """Ids of the sales made between two days, inclusive"""
+    conn = connection_manager.get_connection()
+    rows = conn.execute("SELECT id FROM sales WHERE sale_day BETWEEN ? AND ? ORDER BY id",
+                        (day_key(date_from), day_key(date_to)))
+    return [row[0] for row in rows]
+
+
+def run_invoices(args):
+    """The invoices command: render invoices in worker processes, optionally merged"""
+    connection_manager.set_database_path(os.path.abspath(args.db), read_only=True)
+    sale_ids = args.ids or invoice_sale_ids(args.date_from, args.date_to)
+    if not sale_ids:
+        print("No sales to invoice")
+        return 0
+
+    def on_progress(done, total, sale_id, error):
+        if error is not None:
+            print(f"FAILED invoice for sale {sale_id}: {error}", file=sys.stderr)
+        elif done % 50 == 0 or done == total:
+            print(f"{done}/{total} invoices")
+
+    result = generate_invoices(sale_ids, args.output_dir, args.merge, args.workers, on_progress)
+    print(result)
+    return 1 if result.failed else 0
+
+
+def run_labels(args):
+    """The labels command: one PDF of QR labels for the selected phones"""
+    connection_manager.set_database_path(os.path.abspath(args.db), read_only=True)
+    phones = select_label_phones(args.brand, args.arrived_from, args.arrived_to, args.ids,
+                                 in_stock=args.in_stock)
+    if not phones:
+        print("No phones match")
+        return 1
+    output = args.output or os.path.join(args.output_dir, f"labels_{args.layout}.pdf")
+    result = generate_label_sheet(output, phones, args.layout, args.per_unit, args.workers)
+    print(result)
+    return 0
+
+
+def main(argv=None):
+    # Shared by every command so they can be given after the command name
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--db", default=connection_manager.DB_PATH, help="database file")
+    common.add_argument("--output-dir", default="reports", help="where report files are written")
+    common.add_argument("--workers", type=int, help="worker processes (default: one per CPU)")
+
+    parser = argparse.ArgumentParser(description="Generate phone store reports without the GUI")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    sales = commands.add_parser("sales", parents=[common], help="sales report for a date range")
+    sales.add_argument("--from", dest="date_from", required=True, help="first day, YYYY-MM-DD")
+    sales.add_argument("--to", dest="date_to", required=True, help="last day, YYYY-MM-DD")
+    sales.add_argument("--group-by", nargs="+", default=['Day'],
+                       choices=SALES_GROUPINGS + list(ANALYTICS_REPORTS))
+    sales.add_argument("--format", nargs="+", default=["pdf"], choices=FORMATS)
+
+    stock = commands.add_parser("stock", parents=[common], help="stock report")
+    stock.add_argument("--filter", default="all", choices=list(STOCK_FILTER_ALIASES))
+    stock.add_argument("--brand", help="brand for --filter brand")
+    stock.add_argument("--format", nargs="+", default=["pdf"], choices=FORMATS)
+
+    pack = commands.add_parser("pack", parents=[common], help="a scheduled set of reports")
+    pack.add_argument("name", choices=list(PACKS))
+    pack.add_argument("--date", help="day for the nightly pack (default: yesterday)")
+    pack.add_argument("--month", help="YYYY-MM for the month-end pack (default: last month)")
+    pack.add_argument("--format", nargs="+", default=["pdf"], choices=FORMATS)
+
+    batch = commands.add_parser("batch", parents=[common], help="reports listed in a JSON file")
+    batch.add_argument("jobs_file")
+
+    invoices = commands.add_parser("invoices", parents=[common], help="invoice PDFs for many sales")
+    invoices.set_defaults(output_dir=INVOICES_DIR)
+    invoices.add_argument("--ids", nargs="+", type=int, help="sale ids to invoice")
+    invoices.add_argument("--from", dest="date_from", help="invoice sales from this day, YYYY-MM-DD")
+    invoices.add_argument("--to", dest="date_to", help="invoice sales up to this day, YYYY-MM-DD")
+    invoices.add_argument("--merge", help="also combine the invoices into this PDF (needs pypdf)")
+
+    labels = commands.add_parser("labels", parents=[common], help="a sheet of QR labels for phones")
+    labels.add_argument("--brand")
+    labels.add_argument("--arrived-from", help="phones added on or after this day, YYYY-MM-DD")
+    labels.add_argument("--arrived-to", help="phones added on or before this day, YYYY-MM-DD")
+    labels.add_argument("--ids", nargs="+", type=int, help="phone ids to label")
+    labels.add_argument("--in-stock", action="store_true", help="skip phones with no units left")
+    labels.add_argument("--per-unit", action="store_true", help="one label per unit in stock")
+    labels.add_argument("--layout", choices=list(LABEL_LAYOUTS), default="a4")
+    labels.add_argument("--output", help="PDF file (default: <output-dir>/labels_<layout>.pdf)")
+
+    args = parser.parse_args(argv)
+    if not os.path.exists(args.db):
+        parser.error(f"{args.db} not found")
+    if args.command == "invoices":
+        if not args.ids and not (args.date_from and args.date_to):
+            parser.error("give --ids or both --from and --to")
+        return run_invoices(args)
+    if args.command == "labels":
+        return run_labels(args)
+
+    try:
+        if args.command == "sales":
+            jobs = [sales_job(args.date_from, args.date_to, group_by, fmt, args.output_dir)
+                    for group_by in args.group_by for fmt in args.format]
+        elif args.command == "stock":
+            jobs = [stock_job(STOCK_FILTER_ALIASES[args.filter], args.brand, fmt, args.output_dir)
+                    for fmt in args.format]
+        elif args.command == "pack":
+            if args.name == "nightly":
+                period = args.date or str(date.today() - timedelta(days=1))
+            else:
+                period = args.month or (date.today().replace(day=1) - timedelta(days=1)).strftime("%Y-%m")
+            jobs = PACKS[args.name](period, args.format, args.output_dir)
+        else:
+            jobs = load_batch(args.jobs_file, args.output_dir)
+        for job in jobs:
+            validate_job(job)
+    except (OSError, KeyError, ValueError) as e:
+        parser.error(str(e))
+
+    def on_done(job, summary, error):
+        if error is None:
+            print(summary)
+        else:
+            print(f"FAILED {job['output']}: {type(error).__name__}: {error}", file=sys.stderr)
+
+    started = time.perf_counter()
+    succeeded, failed = run_jobs(jobs, args.db, args.workers, on_done)
+    print(f"{len(succeeded)} of {len(jobs)} reports written in {time.perf_counter() - started:.1f}s")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -0,0 +1,374 @@
+# report_queries.py - Sales and stock report queries and exports, without any UI
+import csv
+import time
+from connection_manager import get_connection
+from date_keys import day_key, day_key_to_date
+from analytics import get_analytics, frame_to_rows
+from bulk_export import ExportResult, open_output
+from excel_export import iter_cursor, write_xlsx, export_query_xlsx
+from pdf_table import money, write_pdf_report
+from report_cache import get_report_cache
+
+# Calendar groupings, all answered together by one pass over the day rollup
+PERIOD_GROUPINGS = ['Day', 'Week', 'Month', 'Year']
+
+# Sales report groupings answered from the sales_daily rollup
+SALES_GROUPINGS = PERIOD_GROUPINGS + ['Product', 'Payment Method']
+
+# Report columns for each calendar grouping
+PERIOD_FIELDS = {
+    period: [period.lower(), "sales_count", "total_quantity", "total_sales"]
+    for period in PERIOD_GROUPINGS
+}
+
+# Group-by options answered from the analytics frames rather than SQL;
+# each maps to a function of (analytics, date_from, date_to) returning a frame
+ANALYTICS_REPORTS = {
+    'Brand by Month': lambda a, start, end: a.breakdown("brand", "month", date_from=start, date_to=end),
+    'Seller by Month': lambda a, start, end: a.breakdown("seller", "month", date_from=start, date_to=end),
+    'Product Margin': lambda a, start, end: a.margins("product", start, end),
+    'Sell-Through': lambda a, start, end: a.sell_through("product", start, end),
+    '7-Day Average': lambda a, start, end: a.rolling_average(7, date_from=start, date_to=end),
+}
+
+STOCK_FILTERS = ['All', 'Low Stock (<5)', 'By Brand']
+STOCK_REPORT_COLUMNS = ['ID', 'Brand', 'Model', 'IMEI', 'Price', 'Quantity', 'Total Value']
+
+
+def report_column_name(field):
+    """ Column heading for a report select field, e.g. 'SUM(x) as total_sales' -> 'Total Sales' """
+    return field.split(' as ')[-1].replace('_', ' ').title()
+
+def build_sales_report_query(date_from, date_to, group_by):
+    """ Return (select_fields, query, params) for a product or payment method report
+
+    The query reads the trigger-maintained sales_daily rollup (one row per
+    day, phone, payment method and seller) instead of scanning sales.
+    date_from and date_to are dates or ISO date strings and the range
+    includes both days. Calendar groupings come from aggregate_sales_periods.
+    """
+    totals = ["SUM(r.sales_count) as sales_count", "SUM(r.total_quantity) as total_quantity",
+              "SUM(r.total_sales) as total_sales"]
+    
+    if group_by == 'Product':
+        group_by_sql = "r.phone_id"
+        select_fields = ["p.brand || ' ' || p.model as product"] + totals
+    elif group_by == 'Payment Method':
+        group_by_sql = "r.payment_method"
+        select_fields = ["NULLIF(r.payment_method, '') as payment_method"] + totals
+    else:
+        raise ValueError(f"Unknown sales report grouping: {group_by}")
+    
+    # Build query
+    query = f"""
+    SELECT {', '.join(select_fields)}
+    FROM sales_daily r
+    LEFT JOIN phones p ON r.phone_id = p.id
+    WHERE r.day BETWEEN ? AND ?
+    GROUP BY {group_by_sql}
+    ORDER BY {group_by_sql}
+    """
+    return select_fields, query, (day_key(date_from), day_key(date_to))
+
+def aggregate_sales_periods(date_from, date_to):
+    """ Day, ISO week, month and year rows plus the grand total, from one scan
+
+    Reads one row per day of the range from sales_daily (a range scan of
+    its primary key) and folds those into the coarser buckets in Python,
+    so every grouping and the total come from the same read and always
+    agree. Returns a dict of grouping -> rows, plus 'Total' ->
+    (sales_count, total_quantity, total_sales).
+    """
+    cursor = get_connection().cursor()
+    cursor.execute("""
+    SELECT day, SUM(sales_count), SUM(total_quantity), SUM(total_sales)
+    FROM sales_daily
+    WHERE day BETWEEN ? AND ?
+    GROUP BY day
+    ORDER BY day
+    """, (day_key(date_from), day_key(date_to)))
+    days = cursor.fetchall()
+    cursor.close()
+    
+    # Buckets are filled in day order, so each dict keeps its keys sorted
+    buckets = {period: {} for period in PERIOD_GROUPINGS}
+    total = [0, 0, 0.0]
+    for key, count, quantity, sales in days:
+        day = day_key_to_date(key)
+        iso_year, iso_week, _ = day.isocalendar()
+        labels = {
+            'Day': day.isoformat(),
+            'Week': f"{iso_year}-W{iso_week:02d}",
+            'Month': f"{day.year:04d}-{day.month:02d}",
+            'Year': day.year,
+        }
+        for period, label in labels.items():
+            bucket = buckets[period].get(label)
+            if bucket is None:
+                bucket = buckets[period][label] = [0, 0, 0.0]
+            bucket[0] += count
+            bucket[1] += quantity
+            bucket[2] += sales
+        total[0] += count
+        total[1] += quantity
+        total[2] += sales
+    
+    # Money is summed in floats, so round away the noise that adds
+    periods = {
+        period: [(label, count, quantity, round(sales, 2))
+                 for label, (count, quantity, sales) in rows.items()]
+        for period, rows in buckets.items()
+    }
+    periods['Total'] = (total[0], total[1], round(total[2], 2))
+    return periods
+
+def query_sales_periods(date_from, date_to):
+    """ aggregate_sales_periods, cached by range until the database changes """
+    key = ('sales_periods', day_key(date_from), day_key(date_to))
+    return get_report_cache().get_or_compute(
+        key, lambda: aggregate_sales_periods(date_from, date_to)
+    )
+
+def query_sales_report(date_from, date_to, group_by):
+    """ Run the sales report query; returns (select_fields, rows, total)
+
+    Results are cached by range and grouping until the database changes.
+    """
+    key = ('sales', day_key(date_from), day_key(date_to), group_by)
+    return get_report_cache().get_or_compute(
+        key, lambda: run_sales_report(date_from, date_to, group_by)
+    )
+
+def run_sales_report(date_from, date_to, group_by):
+    """ Uncached query_sales_report """
+    if group_by in ANALYTICS_REPORTS:
+        return query_analytics_report(date_from, date_to, group_by)
+    if group_by in PERIOD_GROUPINGS:
+        # Switching between calendar groupings reuses the one cached scan
+        periods = query_sales_periods(date_from, date_to)
+        return PERIOD_FIELDS[group_by], periods[group_by], periods['Total'][2]
+
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    select_fields, query, day_range = build_sales_report_query(date_from, date_to, group_by)
+    cursor.execute(query, day_range)
+    results = cursor.fetchall()
+    
+    # Get total sales
+    cursor.execute("""
+    SELECT SUM(total_sales) 
+    FROM sales_daily 
+    WHERE day BETWEEN ? AND ?
+    """, day_range)
+    total_sales = cursor.fetchone()[0] or 0
+    
+    return select_fields, results, total_sales
+
+def query_analytics_report(date_from, date_to, report_name):
+    """ Run one of ANALYTICS_REPORTS; returns (columns, rows, total) like query_sales_report """
+    analytics = get_analytics()
+    result = ANALYTICS_REPORTS[report_name](analytics, date_from, date_to)
+    columns, rows = frame_to_rows(result)
+    total_sales = float(analytics.sales(date_from, date_to)["total_price"].sum())
+    return columns, rows, total_sales
+
+def build_stock_report_query(filter_type, brand=None):
+    """ Return (query, params, totals_query, totals_params) for a stock report
+
+    Totals come from the trigger-maintained inventory_totals table (for one
+    brand when filtering by brand) and the low-stock list from its partial
+    index, so neither scans phones.
+    """
+    query = """
+    SELECT p.id, p.brand, p.model, p.imei, p.price, p.quantity, (p.price * p.quantity) as total_value
+    FROM phones p
+    """
+    params = []
+    totals_query = "SELECT SUM(unit_count), SUM(stock_value) FROM inventory_totals"
+    totals_params = []
+    
+    if filter_type == 'Low Stock (<5)':
+        # Must match idx_phones_low_stock's WHERE for the index to be used
+        query += " WHERE p.quantity < 5"
+    elif filter_type == 'By Brand':
+        if brand:
+            query += " WHERE p.brand = ?"
+            params.append(brand)
+            totals_query += " WHERE brand = ?"
+            totals_params.append(brand)
+    
+    query += " ORDER BY p.brand, p.model"
+    return query, params, totals_query, totals_params
+
+def stock_report_title(filter_type, brand=None):
+    """ Title shown on exported stock reports """
+    if filter_type == 'Low Stock (<5)':
+        return "Low Stock Report"
+    elif filter_type == 'By Brand':
+        return f"Stock Report - {brand}"
+    return "Stock Report"
+
+def query_brands():
+    """ Brands in stock, for the stock report's brand filter """
+    conn = get_connection()
+    return [row[0] for row in conn.execute("SELECT brand FROM inventory_totals ORDER BY brand")]
+
+def query_stock_report(filter_type, brand=None):
+    """ Run the stock report query; returns (rows, total stock value, total units)
+
+    Results are cached by filter until the database changes.
+    """
+    key = ('stock', filter_type, brand if filter_type == 'By Brand' else None)
+    return get_report_cache().get_or_compute(
+        key, lambda: run_stock_report(filter_type, brand)
+    )
+
+def run_stock_report(filter_type, brand=None):
+    """ Uncached query_stock_report """
+    conn = get_connection()
+    cursor = conn.cursor()
+    
+    query, params, totals_query, totals_params = build_stock_report_query(filter_type, brand)
+    cursor.execute(query, params)
+    results = cursor.fetchall()
+    
+    # Get total stock value
+    cursor.execute(totals_query, totals_params)
+    total_units, total_stock = cursor.fetchone()
+    
+    return results, total_stock or 0, total_units or 0
+
+def export_sales_report_xlsx(file_path, date_from, date_to, group_by):
+    """ Stream a sales report from the database into an .xlsx file """
+    if group_by in ANALYTICS_REPORTS:
+        columns, rows, total_sales = query_analytics_report(date_from, date_to, group_by)
+        return write_xlsx(file_path, [report_column_name(c) for c in columns], rows,
+                          sheet_title="Sales Report")
+    if group_by in PERIOD_GROUPINGS:
+        fields, rows, total_sales = query_sales_report(date_from, date_to, group_by)
+        return write_xlsx(file_path, [report_column_name(f) for f in fields], rows,
+                          sheet_title="Sales Report", money_columns=[len(fields) - 1])
+
+    select_fields, query, params = build_sales_report_query(date_from, date_to, group_by)
+    return export_query_xlsx(
+        get_connection(), query, params, file_path,
+        columns=[report_column_name(f) for f in select_fields],
+        sheet_title="Sales Report",
+        money_columns=[len(select_fields) - 1],
+    )
+
+def export_stock_report_xlsx(file_path, filter_type, brand, title):
+    """ Stream a stock report from the database into an .xlsx file """
+    conn = get_connection()
+    query, params, totals_query, totals_params = build_stock_report_query(filter_type, brand)
+    total_stock = conn.execute(totals_query, totals_params).fetchone()[1] or 0
+    
+    footer = [None] * (len(STOCK_REPORT_COLUMNS) - 2) + ["Total Value:", total_stock]
+    return export_query_xlsx(
+        conn, query, params, file_path,
+        columns=STOCK_REPORT_COLUMNS,
+        title=title,
+        sheet_title="Stock Report",
+        money_columns=[4, 6],
+        footer=footer,
+    )
+
+def export_sales_report_pdf(file_path, date_from, date_to, group_by):
+    """ Render a sales report straight from the database into a PDF file """
+    conn = get_connection()
+    title = f"Sales Report ({date_from} to {date_to})"
+    if group_by in ANALYTICS_REPORTS:
+        columns, rows, total_sales = query_analytics_report(date_from, date_to, group_by)
+        return write_pdf_report(file_path, title, [report_column_name(c) for c in columns], rows,
+                                summary_lines=[f"Total Sales: {money(total_sales)}"])
+    if group_by in PERIOD_GROUPINGS:
+        fields, rows, total_sales = query_sales_report(date_from, date_to, group_by)
+        return write_pdf_report(
+            file_path, title, [report_column_name(f) for f in fields], rows,
+            formatters={len(fields) - 1: money},
+            aligns={i: 'R' for i in range(1, len(fields))},
+            summary_lines=[f"Total Sales: {money(total_sales)}"],
+        )
+
+    select_fields, query, params = build_sales_report_query(date_from, date_to, group_by)
+    total_sales = conn.execute(
+        "SELECT SUM(total_sales) FROM sales_daily WHERE day BETWEEN ? AND ?", params
+    ).fetchone()[0] or 0
+    
+    cursor = conn.cursor()
+    cursor.execute(query, params)
+    try:
+        last = len(select_fields) - 1
+        return write_pdf_report(
+            file_path, title, [report_column_name(f) for f in select_fields], iter_cursor(cursor),
+            formatters={last: money},
+            aligns={i: 'R' for i in range(1, len(select_fields))},
+            summary_lines=[f"Total Sales: {money(total_sales)}"],
+        )
+    finally:
+        cursor.close()
+
+def export_stock_report_pdf(file_path, filter_type, brand, title):
+    """ Render a stock report straight from the database into a PDF file """
+    conn = get_connection()
+    query, params, totals_query, totals_params = build_stock_report_query(filter_type, brand)
+    total_units, total_stock = conn.execute(totals_query, totals_params).fetchone()
+    
+    cursor = conn.cursor()
+    cursor.execute(query, params)
+    try:
+        return write_pdf_report(
+            file_path, title, STOCK_REPORT_COLUMNS, iter_cursor(cursor),
+            formatters={4: money, 6: money},
+            aligns={0: 'R', 4: 'R', 5: 'R', 6: 'R'},
+            summary_lines=[f"Total Stock Value: {money(total_stock or 0)} ({total_units or 0:,} units)"],
+        )
+    finally:
+        cursor.close()
+
+def write_csv(file_path, columns, rows, footer=None):
+    """ Write a header, rows and an optional footer row to a CSV file """
+    result = ExportResult(file_path)
+    start = time.perf_counter()
+    with open_output(file_path) as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        for row in rows:
+            writer.writerow(row)
+            result.rows_exported += 1
+        if footer:
+            writer.writerow(footer)
+    result.elapsed = time.perf_counter() - start
+    return result
+
+def export_sales_report_csv(file_path, date_from, date_to, group_by):
+    """ Stream a sales report from the database into a CSV file """
+    if group_by in ANALYTICS_REPORTS:
+        columns, rows, total_sales = query_analytics_report(date_from, date_to, group_by)
+        return write_csv(file_path, [report_column_name(c) for c in columns], rows)
+    if group_by in PERIOD_GROUPINGS:
+        fields, rows, total_sales = query_sales_report(date_from, date_to, group_by)
+        return write_csv(file_path, [report_column_name(f) for f in fields], rows)
+
+    select_fields, query, params = build_sales_report_query(date_from, date_to, group_by)
+    cursor = get_connection().cursor()
+    cursor.execute(query, params)
+    try:
+        return write_csv(file_path, [report_column_name(f) for f in select_fields], iter_cursor(cursor))
+    finally:
+        cursor.close()
+
+def export_stock_report_csv(file_path, filter_type, brand, title=None):
+    """ Stream a stock report from the database into a CSV file """
+    conn = get_connection()
+    query, params, totals_query, totals_params = build_stock_report_query(filter_type, brand)
+    total_stock = conn.execute(totals_query, totals_params).fetchone()[1] or 0
+    
+    cursor = conn.cursor()
+    cursor.execute(query, params)
+    try:
+        footer = [None] * (len(STOCK_REPORT_COLUMNS) - 2) + ["Total Value:", round(total_stock, 2)]
+        return write_csv(file_path, STOCK_REPORT_COLUMNS, iter_cursor(cursor), footer=footer)
+    finally:
+        cursor.close()
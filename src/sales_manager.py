@@ -5,6 +5,12 @@ import sqlite3
 from datetime import datetime, date
 import ttkbootstrap as ttk_boot
 from ttkbootstrap.constants import *
+from connection_manager import get_connection
+from paged_list import KeysetPager, PagedTreeview
+from background_tasks import get_executor, BusyIndicator
+from date_keys import day_key, UNDATED_DAY
+
+PAYMENT_METHODS = ("cash", "credit_card", "bank_transfer", "other")
 
 # Fix for DateEntry compatibility
 class SafeDateEntry:
@@ -79,13 +85,15 @@ class SalesManager:
     def __init__(self, parent_frame, user_data):
         self.parent_frame = parent_frame
         self.user_data = user_data
-        self.db_path = "../data/phone_store.db"
         
         # Initialize variables
         self.sales_tree = None
         self.date_from = None
         self.date_to = None
         
+        # Database work runs on the shared workers, never on the Tk thread
+        self.executor = get_executor(self.parent_frame)
+        
         try:
             self.create_sales_list()
             self.load_sales_data()
@@ -149,6 +157,8 @@ class SalesManager:
                                    command=self.load_sales_data, bootstyle=INFO)
             refresh_btn.pack(side=tk.LEFT)
             
+            self.busy = BusyIndicator(buttons_frame, side=tk.RIGHT, padx=5)
+            
             # Sales tree frame
             tree_frame = ttk.LabelFrame(main_container, text="Sales Records", padding=10)
             tree_frame.pack(fill=tk.BOTH, expand=True)
@@ -180,7 +190,15 @@ class SalesManager:
             # Add scrollbars
             v_scrollbar = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=self.sales_tree.yview)
             h_scrollbar = ttk.Scrollbar(tree_frame, orient=tk.HORIZONTAL, command=self.sales_tree.xview)
-            self.sales_tree.configure(yscrollcommand=v_scrollbar.set, xscrollcommand=h_scrollbar.set)
+            self.sales_tree.configure(xscrollcommand=h_scrollbar.set)
+            
+            # Sales are fetched a page at a time as the list is scrolled
+            self.tree_frame = tree_frame
+            self.sales_pages = PagedTreeview(self.sales_tree, v_scrollbar,
+                                             format_row=self.format_sale_row,
+                                             on_count=self.update_sales_count,
+                                             executor=self.executor, busy=self.busy,
+                                             error_title="Failed to load sales data")
             
             # Pack treeview and scrollbars
             self.sales_tree.grid(row=0, column=0, sticky="nsew")
@@ -197,45 +215,47 @@ class SalesManager:
             print(f"Error creating sales list: {e}")
             messagebox.showerror("Error", f"Failed to create sales interface: {str(e)}")
 
+    def sales_pager(self, where_sql="", params=()):
+        """Keyset pager over sales, newest first"""
+        # Pages are read on worker threads, each with its own connection
+        return KeysetPager(
+            get_connection,
+            """s.id, c.name, c.phone, p.brand || ' ' || p.model,
+               s.quantity, s.unit_price, s.total_price, s.sale_date""",
+            """sales s
+               LEFT JOIN clients c ON c.id = s.client_id
+               LEFT JOIN phones p ON p.id = s.phone_id""",
+            # idx_sales_sale_day holds (sale_day, rowid), so it serves this
+            # order with or without a date filter
+            ["s.sale_day", "s.id"],
+            where_sql=where_sql,
+            params=params,
+            descending=True,
+            count_from_sql="sales s",
+        )
+
+    def format_sale_row(self, sale):
+        """Format a sales row for display"""
+        return (
+            sale[0],  # ID
+            sale[1],  # Customer name
+            sale[2],  # Phone
+            sale[3],  # Product
+            sale[4],  # Quantity
+            f"${sale[5]:.2f}",  # Unit price
+            f"${sale[6]:.2f}",  # Total
+            sale[7]   # Date
+        )
+
+    def update_sales_count(self, loaded, total):
+        """Show how many of the matching sales are loaded"""
+        self.tree_frame.configure(text=f"Sales Records ({loaded} of {total})")
+
     def load_sales_data(self):
         """Load sales data from database"""
         try:
-            # Clear existing data
             if self.sales_tree:
-                for item in self.sales_tree.get_children():
-                    self.sales_tree.delete(item)
-            
-            # Connect to database and fetch data
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                SELECT id, customer_name, customer_phone, product_name, 
-                       quantity, unit_price, total_amount, sale_date 
-                FROM sales 
-                ORDER BY sale_date DESC
-            """)
-            
-            sales_data = cursor.fetchall()
-            conn.close()
-            
-            # Insert data into treeview
-            if self.sales_tree:
-                for sale in sales_data:
-                    # Format the data for display
-                    formatted_sale = (
-                        sale[0],  # ID
-                        sale[1],  # Customer name
-                        sale[2],  # Phone
-                        sale[3],  # Product
-                        sale[4],  # Quantity
-                        f"${sale[5]:.2f}",  # Unit price
-                        f"${sale[6]:.2f}",  # Total
-                        sale[7]   # Date
-                    )
-                    self.sales_tree.insert("", "end", values=formatted_sale)
-            
-            print(f"Loaded {len(sales_data)} sales records")
+                self.sales_pages.load(self.sales_pager())
             
         except Exception as e:
             print(f"Error loading sales data: {e}")
@@ -250,40 +270,27 @@ class SalesManager:
             from_date = self.date_from.get_date()
             to_date = self.date_to.get_date()
             
-            # Clear existing data
-            for item in self.sales_tree.get_children():
-                self.sales_tree.delete(item)
+            pager = self.sales_pager("s.sale_day BETWEEN ? AND ?",
+                                     (day_key(from_date), day_key(to_date)))
+            self.sales_pages.load(pager)
             
-            # Connect to database and fetch filtered data
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            def count_filtered():
+                undated = pager.connection().execute(
+                    "SELECT COUNT(*) FROM sales WHERE sale_day = ?", (UNDATED_DAY,)
+                ).fetchone()[0]
+                return pager.count(), undated
             
-            cursor.execute("""
-                SELECT id, customer_name, customer_phone, product_name, 
-                       quantity, unit_price, total_amount, sale_date 
-                FROM sales 
-                WHERE sale_date BETWEEN ? AND ?
-                ORDER BY sale_date DESC
-            """, (from_date, to_date))
+            def show_counts(counts):
+                shown, undated = counts
+                message = f"Showing {shown} records from {from_date} to {to_date}"
+                if undated:
+                    message += f"\n{undated} sales with an unreadable date are not in any range"
+                messagebox.showinfo("Filter Applied", message)
             
-            sales_data = cursor.fetchall()
-            conn.close()
-            
-            # Insert filtered data
-            for sale in sales_data:
-                formatted_sale = (
-                    sale[0],  # ID
-                    sale[1],  # Customer name
-                    sale[2],  # Phone
-                    sale[3],  # Product
-                    sale[4],  # Quantity
-                    f"${sale[5]:.2f}",  # Unit price
-                    f"${sale[6]:.2f}",  # Total
-                    sale[7]   # Date
-                )
-                self.sales_tree.insert("", "end", values=formatted_sale)
-            
-            messagebox.showinfo("Filter Applied", f"Showing {len(sales_data)} records from {from_date} to {to_date}")
+            self.executor.submit(
+                count_filtered, on_success=show_counts, busy=self.busy,
+                error_title="Failed to filter sales",
+            )
             
         except Exception as e:
             print(f"Error filtering sales: {e}")
@@ -294,15 +301,15 @@ class SalesManager:
         # Create dialog window
         dialog = tk.Toplevel(self.parent_frame)
         dialog.title("Add New Sale")
-        dialog.geometry("400x500")
+        dialog.geometry("400x600")
         dialog.transient(self.parent_frame)
         dialog.grab_set()
         
         # Center the dialog
         dialog.update_idletasks()
         x = (dialog.winfo_screenwidth() // 2) - (400 // 2)
-        y = (dialog.winfo_screenheight() // 2) - (500 // 2)
-        dialog.geometry(f"400x500+{x}+{y}")
+        y = (dialog.winfo_screenheight() // 2) - (600 // 2)
+        dialog.geometry(f"400x600+{x}+{y}")
         
         # Create form fields
         ttk.Label(dialog, text="Customer Name:").pack(pady=5)
@@ -313,18 +320,23 @@ class SalesManager:
         customer_phone_var = tk.StringVar()
         ttk.Entry(dialog, textvariable=customer_phone_var, width=40).pack(pady=5)
         
-        ttk.Label(dialog, text="Product Name:").pack(pady=5)
-        product_name_var = tk.StringVar()
-        ttk.Entry(dialog, textvariable=product_name_var, width=40).pack(pady=5)
+        ttk.Label(dialog, text="Phone ID or IMEI:").pack(pady=5)
+        product_var = tk.StringVar()
+        ttk.Entry(dialog, textvariable=product_var, width=40).pack(pady=5)
         
         ttk.Label(dialog, text="Quantity:").pack(pady=5)
-        quantity_var = tk.StringVar()
+        quantity_var = tk.StringVar(value="1")
         ttk.Entry(dialog, textvariable=quantity_var, width=40).pack(pady=5)
         
-        ttk.Label(dialog, text="Unit Price:").pack(pady=5)
+        ttk.Label(dialog, text="Unit Price (blank for list price):").pack(pady=5)
         price_var = tk.StringVar()
         ttk.Entry(dialog, textvariable=price_var, width=40).pack(pady=5)
         
+        ttk.Label(dialog, text="Payment Method:").pack(pady=5)
+        payment_var = tk.StringVar(value="cash")
+        ttk.Combobox(dialog, textvariable=payment_var, width=37, state="readonly",
+                     values=PAYMENT_METHODS).pack(pady=5)
+        
         ttk.Label(dialog, text="Sale Date:").pack(pady=5)
         date_var = tk.StringVar()
         date_var.set(date.today().strftime("%Y-%m-%d"))
@@ -333,36 +345,73 @@ class SalesManager:
         def save_sale():
             try:
                 # Validate inputs
-                if not all([customer_name_var.get(), customer_phone_var.get(), 
-                          product_name_var.get(), quantity_var.get(), price_var.get()]):
-                    messagebox.showerror("Error", "All fields are required!")
+                customer_name = customer_name_var.get().strip()
+                customer_phone = customer_phone_var.get().strip()
+                product = product_var.get().strip()
+                if not all([customer_name, product, quantity_var.get()]):
+                    messagebox.showerror("Error", "Customer name, phone ID or IMEI and quantity are required!")
                     return
                 
                 quantity = int(quantity_var.get())
-                unit_price = float(price_var.get())
-                total_amount = quantity * unit_price
+                unit_price = float(price_var.get()) if price_var.get().strip() else None
+                if quantity < 1 or (unit_price is not None and unit_price < 0):
+                    raise ValueError("negative quantity or price")
+                sale_date = date_var.get().strip()
+                datetime.strptime(sale_date, "%Y-%m-%d")
+                user_id = self.user_data.get('user_id')
+                payment_method = payment_var.get()
                 
-                # Save to database
-                conn = sqlite3.connect(self.db_path)
-                cursor = conn.cursor()
-                
-                cursor.execute("""
-                    INSERT INTO sales (customer_name, customer_phone, product_name, 
-                                     quantity, unit_price, total_amount, sale_date)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                """, (customer_name_var.get(), customer_phone_var.get(), 
-                     product_name_var.get(), quantity, unit_price, 
-                     total_amount, date_var.get()))
+                def insert_sale():
+                    conn = get_connection()
+                    try:
+                        phone = conn.execute(
+                            "SELECT id, price FROM phones WHERE id = ? OR imei = ?",
+                            (product, product),
+                        ).fetchone()
+                        if phone is None:
+                            raise LookupError(f"No phone with ID or IMEI {product}")
+                        phone_id, list_price = phone
+                        price = list_price if unit_price is None else unit_price
+                        
+                        # Reuse the client with this name and phone number if there is one
+                        client = conn.execute(
+                            "SELECT id FROM clients WHERE name = ? AND COALESCE(phone, '') = ?",
+                            (customer_name, customer_phone),
+                        ).fetchone()
+                        if client:
+                            client_id = client[0]
+                        else:
+                            client_id = conn.execute(
+                                "INSERT INTO clients (name, phone) VALUES (?, ?)",
+                                (customer_name, customer_phone or None),
+                            ).lastrowid
+                        
+                        conn.execute("""
+                            INSERT INTO sales (phone_id, client_id, user_id, quantity,
+                                               unit_price, total_price, payment_method, sale_date)
+                            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                        """, (phone_id, client_id, user_id, quantity, price,
+                              quantity * price, payment_method, sale_date))
+                        conn.commit()
+                    except sqlite3.Error:
+                        conn.rollback()
+                        raise
                 
-                conn.commit()
-                conn.close()
+                def sale_added(_):
+                    messagebox.showinfo("Success", "Sale added successfully!")
+                    dialog.destroy()
+                    self.load_sales_data()  # Refresh the list
                 
-                messagebox.showinfo("Success", "Sale added successfully!")
-                dialog.destroy()
-                self.load_sales_data()  # Refresh the list
+                # Save to database
+                self.executor.submit(
+                    insert_sale, on_success=sale_added,
+                    on_error=lambda e: messagebox.showerror("Error", f"Failed to add sale: {str(e)}"),
+                    busy=self.busy,
+                )
                 
             except ValueError:
-                messagebox.showerror("Error", "Please enter valid numbers for quantity and price!")
+                messagebox.showerror("Error", "Please enter a positive quantity, a valid price "
+                                              "and a YYYY-MM-DD date!")
             except Exception as e:
                 messagebox.showerror("Error", f"Failed to add sale: {str(e)}")
         
@@ -401,15 +450,21 @@ class SalesManager:
         sale_id = sale_values[0]
         
         if messagebox.askyesno("Confirm Delete", f"Are you sure you want to delete sale ID: {sale_id}?"):
-            try:
-                conn = sqlite3.connect(self.db_path)
-                cursor = conn.cursor()
-                cursor.execute("DELETE FROM sales WHERE id = ?", (sale_id,))
-                conn.commit()
-                conn.close()
-                
+            def delete():
+                conn = get_connection()
+                try:
+                    conn.execute("DELETE FROM sales WHERE id = ?", (sale_id,))
+                    conn.commit()
+                except sqlite3.Error:
+                    conn.rollback()
+                    raise
+            
+            def sale_deleted(_):
                 messagebox.showinfo("Success", "Sale deleted successfully!")
                 self.load_sales_data()  # Refresh the list
-                
-            except Exception as e:
-                messagebox.showerror("Error", f"Failed to delete sale: {str(e)}")
\ No newline at end of file
+            
+            self.executor.submit(
+                delete, on_success=sale_deleted,
+                on_error=lambda e: messagebox.showerror("Error", f"Failed to delete sale: {str(e)}"),
+                busy=self.busy,
+            )
\ No newline at end of file
@@ -0,0 +1,80 @@
+# startup_check.py - Import-time budget for the modules loaded at login
+import json
+import os
+import subprocess
+import sys
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Modules imported on the way from the login window to the main window
+STARTUP_MODULES = [
+    "auth",
+    "main",
+    "database",
+    "sales_manager",
+    "phone_manager",
+    "reports",
+    "qr_code",
+    "invoice",
+    "utils",
+]
+
+# Heavy optional dependencies that must only load when their feature is used
+HEAVY_MODULES = [
+    "qrcode",
+    "PIL",
+    "tkcalendar",
+    "fpdf",
+    "openpyxl",
+    "cv2",
+    "pyzbar",
+    "numpy",
+    "pandas",
+    "matplotlib",
+]
+
+# Budget for importing all startup modules, in milliseconds
+IMPORT_BUDGET_MS = 1500
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+for name in {modules!r}:
+    __import__(name)
+elapsed = (time.perf_counter() - start) * 1000
+heavy = [m for m in {heavy!r} if m in sys.modules]
+print(json.dumps({{"elapsed_ms": elapsed, "heavy_loaded": heavy}}))
+"""
+
+
+def measure_startup_imports(modules=STARTUP_MODULES):
+    """Import the startup modules in a fresh interpreter and report the cost"""
+    probe = _PROBE.format(modules=list(modules), heavy=HEAVY_MODULES)
+    result = subprocess.run(
+        [sys.executable, "-c", probe],
+        cwd=SRC_DIR, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Startup imports failed:\n{result.stderr}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def check_startup_budget(budget_ms=IMPORT_BUDGET_MS):
+    """Return True if startup imports stay lazy and within the time budget"""
+    report = measure_startup_imports()
+    print(f"Startup imports took {report['elapsed_ms']:.0f} ms (budget {budget_ms} ms)")
+
+    ok = True
+    if report["heavy_loaded"]:
+        print("❌ Heavy modules loaded at startup: " + ", ".join(report["heavy_loaded"]))
+        ok = False
+    if report["elapsed_ms"] > budget_ms:
+        print("❌ Startup imports are over budget")
+        ok = False
+    if ok:
+        print("✓ Startup imports are within budget")
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if check_startup_budget() else 1)
@@ -2,32 +2,19 @@
 import os
 import sqlite3
 from tkinter import messagebox
-from database import create_connection
+from connection_manager import get_connection
+from bulk_import import import_csv
+from bulk_export import export_table
+from backup_service import BackupService
 
 def backup_database():
-    """ Create a backup of the database """
+    """ Create a verified backup of the database and prune old backups
+
+    This blocks until the copy is done; use backup_service.BackupService
+    .start() to run it in the background with progress reporting.
+    """
     try:
-        if not os.path.exists('data/backups'):
-            os.makedirs('data/backups')
-        
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        backup_path = f"data/backups/phone_store_backup_{timestamp}.db"
-        
-        # Connect to the original database
-        source = create_connection('data/phone_store.db')
-        
-        # Create the backup database
-        backup = sqlite3.connect(backup_path)
-        
-        # Copy the database
-        with backup:
-            source.backup(backup)
-        
-        # Close connections
-        source.close()
-        backup.close()
-        
-        return backup_path
+        return BackupService().run()
         
     except Exception as e:
         messagebox.showerror("Backup Error", f"Failed to create backup: {str(e)}")
@@ -44,15 +31,14 @@ def restore_database(backup_path):
         source = sqlite3.connect(backup_path)
         
         # Connect to the main database (will be overwritten)
-        target = create_connection('data/phone_store.db')
+        target = get_connection()
         
         # Copy the database
         with target:
             source.backup(target)
         
-        # Close connections
+        # Close the backup (the target is the shared connection)
         source.close()
-        target.close()
         
         return True
         
@@ -60,27 +46,19 @@ def restore_database(backup_path):
         messagebox.showerror("Restore Error", f"Failed to restore backup: {str(e)}")
         return False
 
-def export_to_csv(table_name, file_path):
-    """ Export a database table to CSV """
+def export_to_csv(table_name, file_path, columns=None, date_column=None,
+                  date_from=None, date_to=None, fmt='csv', on_progress=None):
+    """ Export a database table to CSV (or JSON Lines with fmt='jsonl')
+
+    Rows are streamed in batches, so large tables export in constant memory.
+    A file name ending in .gz is written gzip-compressed.
+    """
     try:
-        conn = create_connection('data/phone_store.db')
-        cursor = conn.cursor()
-        
-        # Get table data
-        cursor.execute(f"SELECT * FROM {table_name}")
-        rows = cursor.fetchall()
-        
-        # Get column names
-        cursor.execute(f"PRAGMA table_info({table_name})")
-        columns = [column[1] for column in cursor.fetchall()]
-        
-        conn.close()
-        
-        # Write to CSV
-        with open(file_path, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.writer(f)
-            writer.writerow(columns)
-            writer.writerows(rows)
+        result = export_table(get_connection(), table_name, file_path,
+                              columns=columns, date_column=date_column,
+                              date_from=date_from, date_to=date_to,
+                              fmt=fmt, on_progress=on_progress)
+        print(result)
             
         return True
         
@@ -88,34 +66,36 @@ def export_to_csv(table_name, file_path):
         messagebox.showerror("Export Error", f"Failed to export {table_name}: {str(e)}")
         return False
 
-def import_from_csv(table_name, file_path):
-    """ Import data from CSV to a database table """
+def import_from_csv(table_name, file_path, on_progress=None):
+    """ Import data from CSV to a database table
+
+    Phones are upserted on their IMEI so re-importing a supplier catalogue
+    updates existing stock instead of failing. Returns the ImportResult,
+    or False if the import failed.
+    """
     if not os.path.exists(file_path):
         messagebox.showerror("Error", "CSV file not found")
         return False
         
     try:
-        conn = create_connection('data/phone_store.db')
-        cursor = conn.cursor()
+        conn = get_connection()
+        upsert_key = 'imei' if table_name == 'phones' else None
         
-        # Read CSV
-        with open(file_path, 'r', newline='', encoding='utf-8') as f:
-            reader = csv.reader(f)
-            columns = next(reader)  # Get header row
-            
-            # Prepare insert statement
-            placeholders = ', '.join(['?'] * len(columns))
-            query = f"INSERT INTO {table_name} ({', '.join(columns)}) VALUES ({placeholders})"
-            
-            # Insert rows
-            for row in reader:
-                cursor.execute(query, row)
+        result = import_csv(conn, table_name, file_path,
+                            upsert_key=upsert_key, on_progress=on_progress)
+        print(result)
         
-        conn.commit()
-        conn.close()
+        if result.rejected:
+            # Show the first few rejected rows
+            details = "\n".join(f"Line {line_no}: {reason}"
+                                for line_no, row, reason in result.rejected[:10])
+            messagebox.showwarning(
+                "Import Warning",
+                f"{len(result.rejected)} rows were rejected:\n{details}"
+            )
         
-        return True
+        return result
         
     except Exception as e:
         messagebox.showerror("Import Error", f"Failed to import {table_name}: {str(e)}")
-        return False
\ No newline at end of file
+        return False
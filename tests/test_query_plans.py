@@ -0,0 +1,79 @@
+# test_query_plans.py - Report queries use the indexes the migrations add
+import sqlite3
+
+import pytest
+
+from date_keys import UNDATED_DAY
+from diagnose_database import BASE_QUERIES, REPORT_QUERIES, explain, is_full_scan, rollup_mismatches
+from migrations import LATEST_VERSION, run_migrations
+
+INSERT_SALE = """
+    INSERT INTO sales (phone_id, user_id, quantity, unit_price, total_price,
+                       payment_method, sale_date)
+    VALUES (1, 1, 1, ?, ?, 'cash', ?)
+"""
+MALFORMED_DATES = ["2024-03-15 10:00:00", "15/03/2024", None, "", "yesterday", "2024-03-16"]
+
+
+def open_database(path, target_version=LATEST_VERSION):
+    conn = sqlite3.connect(path)
+    assert run_migrations(conn, target_version=target_version) == target_version
+    return conn
+
+
+@pytest.fixture
+def migrated(tmp_path):
+    conn = open_database(str(tmp_path / "phone_store.db"))
+    yield conn
+    conn.close()
+
+
+@pytest.mark.parametrize("name", REPORT_QUERIES)
+def test_base_schema_scans(tmp_path, name):
+    """ Before the migrations every report query reads or sorts the whole table """
+    conn = open_database(str(tmp_path / "phone_store.db"), target_version=1)
+    try:
+        plan = explain(conn, BASE_QUERIES.get(name, REPORT_QUERIES[name]))
+    finally:
+        conn.close()
+    assert is_full_scan(plan), plan
+
+
+@pytest.mark.parametrize("name", REPORT_QUERIES)
+def test_migrated_schema_uses_indexes(migrated, name):
+    plan = explain(migrated, REPORT_QUERIES[name])
+    assert not is_full_scan(plan), plan
+
+
+def test_malformed_dates_survive_migration(tmp_path):
+    """ Undated sales already in the table don't stop the rollup backfill """
+    conn = open_database(str(tmp_path / "phone_store.db"), target_version=3)
+    try:
+        for price, sale_date in enumerate(MALFORMED_DATES, start=1):
+            conn.execute(INSERT_SALE, (price, price, sale_date))
+        conn.commit()
+
+        assert run_migrations(conn) == LATEST_VERSION
+        assert rollup_mismatches(conn) == []
+        undated = conn.execute(
+            "SELECT COUNT(*) FROM sales WHERE sale_day = ?", (UNDATED_DAY,)
+        ).fetchone()[0]
+        assert undated == 4
+    finally:
+        conn.close()
+
+
+def test_malformed_dates_through_triggers(migrated):
+    """ Undated sales can be inserted, updated and deleted after migrating """
+    for price, sale_date in enumerate(MALFORMED_DATES, start=10):
+        migrated.execute(INSERT_SALE, (price, price, sale_date))
+    migrated.execute("UPDATE sales SET sale_date = '31/12/2024' WHERE sale_date = '2024-03-16'")
+    migrated.execute("UPDATE sales SET sale_date = '2024-04-01' WHERE sale_date = 'yesterday'")
+    migrated.execute("DELETE FROM sales WHERE sale_date IS NULL OR sale_date = '2024-03-15 10:00:00'")
+    migrated.commit()
+
+    # Every sale has a day key, so the sales list can page past the undated ones
+    assert migrated.execute("SELECT COUNT(*) FROM sales WHERE sale_day IS NULL").fetchone()[0] == 0
+    assert rollup_mismatches(migrated) == []
+    days = [row[0] for row in migrated.execute("SELECT day FROM sales_daily ORDER BY day")]
+    assert days == [20240401]
@@ -0,0 +1,21 @@
+# test_startup_budget.py - The login path stays lazy and within its import budget
+import pytest
+
+from startup_check import IMPORT_BUDGET_MS, measure_startup_imports
+
+# The startup modules build Tk windows, so they need the GUI toolkit
+pytest.importorskip("tkinter")
+pytest.importorskip("ttkbootstrap")
+
+
+@pytest.fixture(scope="module")
+def report():
+    return measure_startup_imports()
+
+
+def test_no_heavy_modules_at_startup(report):
+    assert report["heavy_loaded"] == []
+
+
+def test_startup_imports_within_budget(report):
+    assert report["elapsed_ms"] <= IMPORT_BUDGET_MS